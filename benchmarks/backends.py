@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+    Times the main Backend calls of each available backend (the daemon one
+    when "python -m itask --daemon" is running).
+
+    python benchmarks/backends.py [--tasks N] [--latency MS] [--task-data DIR]
+"""
+
+import argparse
+import os
+import shutil
+import time
+
+from itask.daemon import socket_path
+from itask.daemonclient import DaemonClient
+from itask.fakebackend import FakeBackend
+from itask.nativetaskwarriorwrapper import NativeTaskwarriorWrapper
+from itask.taskwarriorwrapper import TaskwarriorWrapper
+
+
+def _time(function, repeat):
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        function()
+
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def benchmark(name, backend, report, repeat):
+    calls = {
+            'load': lambda: backend.load(report, None),
+            'export': lambda: backend.export(report, None),
+            'reports': backend.reports,
+            'contexts': backend.contexts,
+            }
+
+    results = ['{}: {:.2f} ms'.format(call, _time(function, repeat))
+               for call, function in calls.items()]
+
+    print('{:8} {}'.format(name, ', '.join(results)))
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--task-data')
+    parser.add_argument('--report', default='next')
+    parser.add_argument('--repeat', type=int, default=5)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line()
+
+    benchmark('fake', FakeBackend(args.tasks, args.latency / 1000),
+              args.report, args.repeat)
+
+    if shutil.which('task'):
+        benchmark('cli', TaskwarriorWrapper(args.task_data), args.report,
+                  args.repeat)
+        benchmark('native', NativeTaskwarriorWrapper(args.task_data),
+                  args.report, args.repeat)
+
+    if os.path.exists(socket_path()):
+        benchmark('daemon', DaemonClient(args.task_data), args.report,
+                  args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+    Times the in process filters over the tasks of the fake backend, scanning
+    every task and narrowing them down with a TaskIndex first.
+
+    With --task-data (and task installed) the tasks matched in process are
+    also checked against "task export" for each filter, printing the
+    differences.
+
+    python benchmarks/filters.py [--tasks N] [--task-data DIR]
+"""
+
+import argparse
+import shutil
+import time
+
+from itask.fakebackend import FakeBackend
+from itask.nativetaskwarriorwrapper import NativeTaskwarriorWrapper
+from itask.taskfilter import TaskFilter, TaskIndex, UnsupportedFilter
+from itask.taskwarriorwrapper import TaskwarriorWrapper
+
+FILTERS = [
+        'status:pending',
+        '+work',
+        '-work',
+        'project:work',
+        'project.is:work',
+        'project:',
+        'status:pending +next',
+        '( +home or +bug ) status:pending',
+        'due.before:eow',
+        'due.after:now-1w +OVERDUE',
+        'due:today',
+        'scheduled.any:',
+        'urgency.over:10',
+        'description.has:fix',
+        'review',
+        '1-5,9 12',
+        ]
+
+
+def _time(function, repeat):
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        function()
+
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def benchmark(tasks, repeat):
+    index = TaskIndex(tasks)
+
+    print(f'{"filter":36} {"tasks":>7} {"scan (ms)":>10} {"index (ms)":>11}')
+
+    for tokens in FILTERS:
+        task_filter = TaskFilter(tokens.split())
+
+        # The index of each attribute is built on its first lookup
+        matches = len(task_filter.select(tasks, index))
+
+        scan = _time(lambda: task_filter.select(tasks), repeat)
+        indexed = _time(lambda: task_filter.select(tasks, index), repeat)
+
+        print(f'{tokens:36} {matches:7} {scan:10.2f} {indexed:11.2f}')
+
+
+def cross_check(task_data):
+    native = NativeTaskwarriorWrapper(task_data)
+    binary = TaskwarriorWrapper(task_data)
+
+    for tokens in FILTERS:
+        filters = tokens.split()
+
+        try:
+            tasks = native._evaluate_report(native.tasks(), 'all', filters)
+        except UnsupportedFilter as e:
+            print(f'{tokens}: unsupported ({e})')
+            continue
+
+        in_process = set(task.uuid for task in tasks)
+        exported = set(task.uuid for task in binary.export('all', filters))
+
+        if in_process == exported:
+            print(f'{tokens}: {len(exported)} tasks, same')
+        else:
+            print(f'{tokens}: {len(exported)} tasks, ' +
+                  f'{len(in_process - exported)} more in process, ' +
+                  f'{len(exported - in_process)} missing')
+
+
+def parse_command_line():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--tasks', type=int, default=100000)
+    parser.add_argument('--task-data')
+    parser.add_argument('--repeat', type=int, default=5)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line()
+
+    benchmark(FakeBackend(args.tasks).export('all', None), args.repeat)
+
+    if args.task_data and shutil.which('task'):
+        print()
+
+        cross_check(args.task_data)
+
+
+if __name__ == '__main__':
+    main()
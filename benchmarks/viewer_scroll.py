@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+    Measures the cost of the frames painted while navigating vertically (the
+    data area going down and up a line, repainted in full every time), with
+    the encoded rows cache of Viewer and with it emptied before every frame.
+
+    python benchmarks/viewer_scroll.py
+"""
+
+import io
+import sys
+import time
+
+from itask.dataprovider import DataProvider
+from itask.selection import Selection
+from itask.viewer import Region, Viewer
+
+LINES = 50000
+HEIGHT = 50
+FRAMES = 2000
+
+
+def _make_viewer(width):
+    data_provider = DataProvider()
+    data_provider.update('\n'.join(
+        f'{i:7} Tâsk description number {i} '.ljust(width + 40, '.')
+        for i in range(LINES)))
+
+    constraints = {'top': 0, 'bottom': LINES}
+
+    selection = Selection(0, constraints=constraints)
+
+    region = Region(size={'width': width, 'height': HEIGHT},
+                    horizontal_constraints={
+                        'left': 0,
+                        'right': data_provider.size.largest_line},
+                    vertical_constraints=constraints)
+
+    return Viewer(data_provider, region, selection)
+
+
+def _frame_time(viewer, cached):
+    start = time.perf_counter()
+
+    for frame in range(FRAMES):
+        viewer.region.move('down' if frame % 2 == 0 else 'up')
+
+        if not cached:
+            viewer.clear_cache()
+
+        viewer.invalidate()
+        viewer.update()
+
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+
+def main():
+    stdout = sys.stdout
+    sys.stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+
+    results = []
+
+    try:
+        for width in (80, 200):
+            viewer = _make_viewer(width)
+
+            uncached = _frame_time(viewer, cached=False)
+            cached = _frame_time(viewer, cached=True)
+
+            results.append((width, uncached, cached))
+    finally:
+        sys.stdout = stdout
+
+    print(f'{"width":>6} {"uncached (ms)":>14} {"cached (ms)":>12}')
+
+    for width, uncached, cached in results:
+        print(f'{width:6} {uncached:14.3f} {cached:12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+    Measures the cost of one Viewer.update() with the region at the top and
+    at the bottom of reports of growing size. Frame cost must not depend on
+    the report length.
+
+    python benchmarks/viewer_update.py
+"""
+
+import io
+import sys
+import time
+
+from itask.dataprovider import DataProvider
+from itask.selection import Selection
+from itask.viewer import Region, Viewer
+
+WIDTH = 120
+HEIGHT = 50
+
+
+def _make_viewer(line_count):
+    data_provider = DataProvider()
+    data_provider.update('\n'.join(
+        f'{i:7} Task description number {i} '.ljust(WIDTH + 40, '.')
+        for i in range(line_count)))
+
+    constraints = {'top': 0, 'bottom': line_count}
+
+    selection = Selection(0, constraints=constraints)
+
+    region = Region(size={'width': WIDTH, 'height': HEIGHT},
+                    horizontal_constraints={
+                        'left': 0,
+                        'right': data_provider.size.largest_line},
+                    vertical_constraints=constraints)
+
+    return Viewer(data_provider, region, selection)
+
+
+def _frame_time(viewer, position, repeat):
+    viewer.region.move(position)
+
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        viewer.invalidate()
+        viewer.update()
+
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    stdout = sys.stdout
+    sys.stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+
+    results = []
+
+    try:
+        for line_count in (1000, 10000, 100000, 200000):
+            viewer = _make_viewer(line_count)
+
+            top = _frame_time(viewer, 'top', 200)
+            bottom = _frame_time(viewer, 'bottom', 200)
+
+            results.append((line_count, top, bottom))
+    finally:
+        sys.stdout = stdout
+
+    print(f'{"lines":>8} {"top (ms)":>10} {"bottom (ms)":>12}')
+
+    for line_count, top, bottom in results:
+        print(f'{line_count:8} {top:10.3f} {bottom:12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,36 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import os
 import shutil
+import threading
+import time
 from itask import configs
+from itask.daemon import Daemon, DaemonError
+from itask.daemonclient import DaemonClient
 from itask.dataprovider import DataProvider
-from itask.imenu import Menu, MenuItem, Navigable
+from itask.eventloop import EventLoop
+from itask.fakebackend import FakeBackend
+from itask.imenu import Menu, MenuItem, Navigable, Prompt
+from itask.layout import Layout
+from itask.nativetaskwarriorwrapper import NativeTaskwarriorWrapper
+from itask.reportcache import ReportCache, report_size
+from itask.reportformatter import ReportFormatter
+from itask.search import Search
 from itask.selection import Selection
+from itask.snapshot import Snapshot, SnapshotStore, file_stamp
 from itask.taskwarriorreportparser import TaskwarriorReportParser
+from itask.taskfilter import UnsupportedFilter
 from itask.taskwarriorwrapper import TaskwarriorWrapper
-from itask.viewer import Viewer, Region
 from itask import get_version
 
 from itask import console
 
-from tabular.factory import TableFactory
-from tabular.formatters import BoolFormatter
-from tabular.theme import DefaultTheme
-
 import sys
 
+# Seconds between the batches of lines a streamed report is painted in
+STREAM_INTERVAL = 0.05
+
 
 class MainMenu(Navigable):
 
@@ -27,6 +39,12 @@ class MainMenu(Navigable):
 
         self.report = args.report
 
+        self._load_mode = args.load_mode
+
+        # The context given on the command line or chosen (None: the one set
+        # on taskrc)
+        self._context = args.context
+
         self._filter_stack = [None]
         if args.filter:
             self.filters = args.filter.split(' ') if args.filter else None
@@ -43,13 +61,81 @@ class MainMenu(Navigable):
 
         self._report_parser = TaskwarriorReportParser()
 
+        self._tasks = None
+
+        # Exported tasks and the report key (see _report_key()) they were
+        # exported for, narrowed down in process when filters are appended
+        self._loaded_tasks = None
+        self._loaded_key = None
+
         self._first_usable_line = 1
+        self._first_data_line = self._first_usable_line + 2
+
+        self._selection = Selection(self._first_data_line)
+
+        # Menu title and items at the bottom
+        menu_height = 2
+
+        self._layout = Layout(self._data_provider, self._selection,
+                              first_line=self._first_usable_line,
+                              reserved_lines=menu_height)
+        # Report header (labels and dashes) and footer (empty line and tasks
+        # count)
+        self._layout.freeze(rows=self._first_data_line -
+                            self._first_usable_line)
+        self._layout.trailing_lines = 2
+
+        self._left_viewer = self._layout.viewer('left')
+        self._data_viewer = self._layout.viewer('data')
+
+        self._search = Search(self._data_provider, self._searchable_lines)
+        self._left_viewer.search = self._search
+        self._data_viewer.search = self._search
+
+        # Incremented on every data update, so a background reload started
+        # before one can be discarded
+        self._data_generation = 0
+
+        # Incremented every time the data is changed
+        self._data_version = 0
+
+        # Reports already loaded, to go back to them without loading them
+        # again
+        self._report_cache = ReportCache()
+
+        self._watched_files = self._binary_wrapper.watched_files()
+
+        self._data_watch = EventLoop().watch_files(self._watched_files,
+                                                   self._data_files_changed)
+
+        # file_stamp() of the data files when the data was loaded
+        self._data_stamp = None
+
+        # Held while loading from the backend, which isn't thread safe:
+        # _fetch_data() also runs on a background thread
+        self._backend_lock = threading.RLock()
+
+        # What the snapshot of the current report is saved for
+        self._snapshot_arguments = [args.task_data or os.getenv('TASKDATA'),
+                                    args.backend, args.load_mode]
+        self._snapshots = SnapshotStore() if args.snapshot else None
+
+        # The snapshot on the screen, until the report is loaded
+        self._snapshot = None
+
+        # Whether a report is being streamed into the data provider
+        self._streaming = False
+
+        self._title_line = ''
+
+        # (report, context, filters) the layout was last rewound for
+        self._arranged_view = None
 
         configs.load()
 
         self._make_menu()
 
-        self._do_data_update()
+        self._first_data_update()
 
     def _make_menu(self):
         self.main_menu = Menu(redraw=False, back=False)
@@ -154,166 +240,436 @@ class MainMenu(Navigable):
         self.main_menu.append_navigation_keys(self)
 
     def terminal_resized(self, origin, columns, lines):
-        self._left_top_fixed_viewer.invalidate()
-        self._header_viewer.invalidate()
-        self._left_viewer.invalidate()
-        self._data_viewer.invalidate()
+        self._layout.arrange(columns, lines)
+
+    def _arrange_gui(self):
+        """
+            Lays the viewers out for the current data, from its beginning when
+            it is another report (or context, or filters). Loading the same
+            one again keeps the scroll and the active line.
+        """
+        if self._has_data():
+            self._layout.freeze(columns=self._report_parser.idColumnWidth())
+        else:
+            self._layout.freeze(columns=0)
 
-        self._make_gui(columns, lines)
+        size = shutil.get_terminal_size()
 
-        console.clear_screen()
+        self._layout.arrange(size.columns, size.lines)
 
-        self.render(self)
+        view = (self.report, self._context, tuple(self.filters or ()))
 
-        self.main_menu.render()
+        if view != self._arranged_view:
+            self._layout.rewind()
 
-    def _make_gui(self, columns, lines):
-        if self._has_data():
-            fixed_left = self._report_parser.idColumnWidth()
-        else:
-            fixed_left = 0
-        fixed_top = 2
-        menu_height = 2
-        footer_height = 2
-
-        left_top_fixed_region = Region(
-                size={
-                    'width': fixed_left,
-                    'height': fixed_top},
-                position={
-                    'left': 0,
-                    'top': self._first_usable_line})
-
-        self._left_top_fixed_viewer = Viewer(
-                self._data_provider,
-                left_top_fixed_region,
-                screen_left=0,
-                screen_top=0)
-
-        data_width = columns - fixed_left - 1
-        data_horizontal_constraints = {
-                'left': fixed_left,
-                'right': self._data_provider.size.largest_line}
-        header_region = Region(
-            size={'width': data_width, 'height': fixed_top},
-            position={'left': fixed_left, 'top': self._first_usable_line},
-            horizontal_constraints=data_horizontal_constraints)
-
-        self._header_viewer = Viewer(
-                self._data_provider,
-                header_region,
-                screen_left=fixed_left,
-                screen_top=0)
-
-        data_height = lines - fixed_top - menu_height
-        data_vertical_constraints = {
-                'top': self._first_usable_line + fixed_top,
-                'bottom': self._data_provider.size.lines - footer_height}
-
-        self._selection = Selection(
-                self._first_usable_line + fixed_top,
-                constraints=data_vertical_constraints)
-
-        left_region = Region(
-            size={'width': fixed_left, 'height': data_height},
-            position={'left': 0, 'top': self._first_usable_line + fixed_top},
-            vertical_constraints=data_vertical_constraints)
-
-        self._left_viewer = Viewer(
-                self._data_provider,
-                left_region,
-                self._selection,
-                screen_left=0,
-                screen_top=2)
-
-        data_region = Region(
-            size={'width': data_width, 'height': data_height},
-            position={'left': fixed_left, 'top': 3},
-            horizontal_constraints=data_horizontal_constraints,
-            vertical_constraints=data_vertical_constraints)
-
-        self._data_viewer = Viewer(
-            self._data_provider,
-            data_region,
-            self._selection,
-            screen_left=fixed_left,
-            screen_top=2)
+            self._arranged_view = view
 
     def run(self):
         self.main_menu.run()
 
+        self._save_snapshot()
+
+    def _snapshot_key(self):
+        filters = list(self.filters) if self.filters else []
+
+        return self._snapshot_arguments + [self._context, self.report,
+                                           filters]
+
+    def _first_data_update(self):
+        """
+            Paints the snapshot saved by the last run for the same report
+            right away, and loads the report on a background thread; without
+            a snapshot, loads it here.
+        """
+        snapshot = None
+
+        if self._snapshots:
+            snapshot = self._snapshots.load(self._snapshot_key())
+
+        if snapshot is None:
+            self._do_data_update()
+
+            return
+
+        self._data_generation += 1
+
+        self._apply_data(None, TaskwarriorReportParser(), snapshot.text,
+                         snapshot)
+
+        def loaded(data):
+            # The data shown changes, not the task selected
+            active_id = self._get_active_id()
+
+            self._apply_data(*data)
+            self._cache_data(self._report_key(), data)
+
+            self._select_task(active_id)
+
+            # The report may be laid out differently, or be shorter
+            self.main_menu.clear()
+
+        self._fetch_in_background(loaded)
+
+    def _save_snapshot(self):
+        # Nothing worth painting, or not loaded yet
+        if self._snapshots is None or self._snapshot is not None or \
+                self._streaming or not self._has_data() or \
+                not self._report_parser.idColumnWidth():
+            return
+
+        text = '\n'.join(self._data_provider.lines)
+
+        self._snapshots.save(Snapshot(self._snapshot_key(), text,
+                                      self._data_stamp, self._title_line))
+
+    def _select_task(self, task_id):
+        """
+            Activates the line of the task with task_id, if it is shown.
+        """
+        if task_id is None:
+            return
+
+        last_line = len(self._data_provider.lines) - \
+            self._layout.trailing_lines
+
+        for line in range(self._first_data_line, last_line):
+            if self._get_line_id(line) == task_id:
+                self._selection.move('set', line)
+
+                return
+
+    def _report_key(self):
+        """
+            Returns what tells the current report apart from the others, the
+            key of the report cache.
+        """
+        filters = tuple(self.filters) if self.filters else ()
+
+        return (self.report, self._get_context(), filters,
+                self._data_version)
+
     def _do_data_update(self):
-        stream = self._binary_wrapper.load(self.report, self.filters)
+        self._data_generation += 1
+
+        key = self._report_key()
+
+        if self._load_mode == 'report':
+            self._stream_report(key)
+
+            return
+
+        try:
+            data = self._fetch_data()
+        except Exception as e:
+            # Like a filter the backend can't evaluate: the data shown is
+            # kept
+            self._load_failed(e)
+
+            return
+
+        self._apply_data(*data)
+        self._cache_data(key, data)
+
+    def _load_failed(self, error):
+        """
+            Shows error in the title instead of ending the loop.
+        """
+        self.main_menu.title = f'Loading the report failed: {error}'
+
+        self.main_menu.invalidate()
+
+    def _cache_data(self, key, data):
+        tasks, report_parser, stream = data
+
+        self._report_cache.put(key, data, report_size(tasks, stream))
+
+    def _fetch_data(self):
+        """
+            Queries the backend for the current report. Doesn't touch the GUI,
+            so it can run on a background thread.
+
+            Returns the exported tasks (None in report mode), the report parser
+            and the report text.
+        """
+        with self._backend_lock:
+            if self._load_mode == 'export':
+                tasks = self._binary_wrapper.export(self.report, self.filters)
+
+                columns, labels = \
+                    self._binary_wrapper.report_columns(self.report)
+                report_parser = ReportFormatter(columns, labels)
+
+                return tasks, report_parser, report_parser.format(tasks)
+
+            stream = self._binary_wrapper.load(self.report, self.filters)
+
+        return None, self._report_parser, stream
+
+    def _apply_data(self, tasks, report_parser, stream, snapshot=None):
+        self._loaded_tasks = tasks
+        self._loaded_key = self._report_key() if tasks is not None else None
+
+        self._show_data(tasks, report_parser, stream, snapshot)
+
+    def _show_data(self, tasks, report_parser, stream, snapshot=None):
+        """
+            snapshot: The Snapshot stream comes from, if it isn't loaded data.
+        """
+        self._snapshot = snapshot
+        self._streaming = False
+
+        self._tasks = tasks
+        self._report_parser = report_parser
 
         self._data_provider.update(stream)
 
-        if self._has_data():
-            header_line = self._data_provider.lines[self._first_usable_line]
-            self._report_parser.set_header_line(header_line)
+        self._data_loaded()
+
+    def _data_loaded(self):
+        # The matches are looked up again in the new data
+        query = self._search.query
+        self._search.clear()
+        self._search.update(query)
+
+        self._parse_header()
 
         self._update_menu_title()
 
-        size = shutil.get_terminal_size()
+        self._arrange_gui()
+
+        # What is on the screen is up to date with the files now
+        self._data_watch.reset()
+        self._data_stamp = file_stamp(self._watched_files)
+
+    def _data_files_changed(self):
+        """
+            Reloads the report on a background thread when the data files are
+            changed by something else (another "task" run, a sync...).
+        """
+        def loaded(data):
+            self._data_version += 1
+            self._report_cache.clear()
+
+            self._apply_data(*data)
+            self._cache_data(self._report_key(), data)
+
+            self._selection.clear()
+
+        self._fetch_in_background(loaded)
+
+    def _fetch_in_background(self, loaded):
+        """
+            Runs _fetch_data() on a background thread, then loaded(data) on
+            the loop, unless the data was updated in the meantime.
+        """
+        generation = self._data_generation
+
+        def fetched(future):
+            if generation != self._data_generation:
+                return
+
+            self._data_generation += 1
+
+            try:
+                data = future.result()
+            except Exception as e:
+                # The data is loaded again on the next change of the files
+                self._load_failed(e)
+            else:
+                loaded(data)
+
+            self.main_menu.invalidate()
+
+        EventLoop().run_in_background(self._fetch_data, fetched)
+
+    def _stream_report(self, key):
+        """
+            Reads the report on a background thread, feeding its lines into
+            the data provider from the loop while task runs: the first lines
+            are painted, and keys handled, before it is done.
+        """
+        generation = self._data_generation
+
+        loop = EventLoop()
+
+        self._loaded_tasks = None
+        self._loaded_key = None
+
+        self._tasks = None
+        self._snapshot = None
+        self._streaming = True
+
+        self._data_provider.clear()
+
+        self._arrange_gui()
+
+        def read():
+            lines = []
+            batch = []
+            posted = time.monotonic()
+
+            with self._backend_lock:
+                for line in self._binary_wrapper.load_stream(self.report,
+                                                             self.filters):
+                    # Another load took over
+                    if generation != self._data_generation:
+                        return None
+
+                    lines.append(line)
+                    batch.append(line)
+
+                    if time.monotonic() - posted >= STREAM_INTERVAL:
+                        loop.call_soon_threadsafe(
+                                lambda batch=batch: appended(batch))
+
+                        batch = []
+                        posted = time.monotonic()
+
+            loop.call_soon_threadsafe(lambda: appended(batch))
+
+            return '\n'.join(lines)
+
+        def appended(batch):
+            if generation != self._data_generation:
+                return
+
+            for line in batch:
+                self._data_provider.append(line)
+
+            if len(self._data_provider.lines) > self._first_data_line:
+                self._parse_header()
+
+                self._arrange_gui()
+
+            self.main_menu.invalidate()
 
-        self._make_gui(columns=size.columns, lines=size.lines)
+        def done(future):
+            if generation != self._data_generation:
+                return
+
+            self._streaming = False
+
+            try:
+                stream = future.result()
+            except Exception as e:
+                self._load_failed(e)
+            else:
+                self._data_loaded()
+
+                self._cache_data(key, (None, self._report_parser, stream))
+
+            self.main_menu.invalidate()
+
+        loop.run_in_background(read, done)
+
+    def _parse_header(self):
+        if self._has_data() and self._tasks is None:
+            header_line = self._data_provider.lines[self._first_usable_line]
+            self._report_parser.set_header_line(header_line)
 
     def _has_data(self):
+        if self._tasks is not None:
+            return len(self._tasks) > 0
+
         return len(self._data_provider.lines) > 1
 
     def _data_changed(self, origin):
+        # itask's own "task" run just finished, the reload below covers it
+        self._data_watch.reset()
+
+        self._data_version += 1
+        self._report_cache.clear()
+
         self._do_data_update()
 
         self._selection.clear()
 
     def render(self, origin):
         console.change_cursor_visibility(False)
-        console.change_getch_echo(False)
 
-        self._left_top_fixed_viewer.update()
-        self._header_viewer.update()
-        self._left_viewer.update()
-        self._data_viewer.update()
+        self._scroll_data_area()
+
+        for viewer in self._layout.viewers:
+            viewer.update()
+
+    def _scroll_data_area(self):
+        """
+            When the data area moved less than a screen, shifts what is
+            already on the terminal instead of repainting it all. Left and data
+            viewers must move together, since the terminal scrolls whole
+            lines.
+        """
+        delta = self._data_viewer.pending_scroll
+
+        if not delta or delta != self._left_viewer.pending_scroll:
+            return
+
+        top = self._data_viewer.screen_top + 1
+        bottom = top + self._data_viewer.region.height - 1
+
+        console.scroll_lines(top, bottom, delta)
+
+        self._data_viewer.scrolled()
+        self._left_viewer.scrolled()
 
     def item_chosen(self, origin, item):
         if item.interactive:
             console.change_cursor_visibility(True)
-            console.change_getch_echo(True)
 
             console.clear_screen()
 
-            self._left_top_fixed_viewer.invalidate()
-            self._header_viewer.invalidate()
-            self._left_viewer.invalidate()
-            self._data_viewer.invalidate()
+            for viewer in self._layout.viewers:
+                viewer.invalidate()
 
     def after_action(self, origin, item):
         if item and item.interactive:
             console.change_cursor_visibility(True)
-            console.change_getch_echo(True)
             console.clear_screen()
 
     def _quit(self):
         print('Bye!')
 
+    def _get_line_id(self, line_index):
+        if self._tasks is not None:
+            task_index = line_index - self._first_data_line
+
+            if task_index in range(len(self._tasks)):
+                return self._tasks[task_index].id
+
+            return None
+
+        return self._report_parser.getId(self._data_provider.lines[line_index])
+
     def _get_selected_ids(self):
-        if len(self._selection.selected_lines) == 0:
-            active_line_idx = self._selection.active_line
-            active_line = self._data_provider.lines[active_line_idx]
+        lines = self._selection.lines()
 
-            return [self._report_parser.getId(active_line)]
+        if not lines:
+            return [self._get_line_id(self._selection.active_line)]
 
         ids = []
 
-        for line in self._selection.selected_lines:
-            id = self._report_parser.getId(self._data_provider.lines[line])
-            ids.append(id)
+        for line in lines:
+            ids.append(self._get_line_id(line))
 
         return ids
 
     def _get_active_id(self):
-        active_line = self._data_provider.lines[self._selection.active_line]
+        return self._get_line_id(self._selection.active_line)
 
-        return self._report_parser.getId(active_line)
+    def _showing_snapshot(self):
+        """
+            Tells the user the tasks shown can't be acted on yet when they come
+            from a snapshot: task renumbers them, so its IDs may be stale.
+        """
+        if self._snapshot is None:
+            return False
+
+        print('The report is still loading: the task IDs of the snapshot '
+              'shown may have changed.')
+
+        console.wait()
+
+        return True
 
     def task_add(self):
         print('cancel  :  - or empty')
@@ -328,6 +684,9 @@ class MainMenu(Navigable):
         console.wait()
 
     def task_annotate(self):
+        if self._showing_snapshot():
+            return
+
         id = self._get_active_id()
 
         print('cancel  :  - or empty')
@@ -342,6 +701,9 @@ class MainMenu(Navigable):
         console.wait()
 
     def task_note(self):
+        if self._showing_snapshot():
+            return
+
         id = self._get_active_id()
 
         from subprocess import run
@@ -353,6 +715,9 @@ class MainMenu(Navigable):
         console.wait()
 
     def task_done(self):
+        if self._showing_snapshot():
+            return
+
         ids = self._get_selected_ids()
 
         self._binary_wrapper.done(ids)
@@ -360,6 +725,9 @@ class MainMenu(Navigable):
         console.wait()
 
     def task_view(self):
+        if self._showing_snapshot():
+            return
+
         ids = self._get_selected_ids()
 
         self._binary_wrapper.view(ids)
@@ -367,6 +735,9 @@ class MainMenu(Navigable):
         console.wait()
 
     def task_mod(self):
+        if self._showing_snapshot():
+            return
+
         ids = self._get_selected_ids()
 
         print('cancel  :  - or empty')
@@ -403,7 +774,7 @@ class MainMenu(Navigable):
 
         self._update_menu_title()
 
-        self._binary_wrapper.invalidate_data()
+        self._reload()
 
     def _show_filter_headers(self):
         filter = ', '.join(self.filters) if self.filters else None
@@ -419,7 +790,7 @@ class MainMenu(Navigable):
         elif new_filters == '':
             self.filters = None
         elif append and self.filters:
-            self.filters += new_filters.split(' ')
+            self.filters = self.filters + new_filters.split(' ')
         else:
             self.filters = new_filters.split(' ')
 
@@ -427,27 +798,96 @@ class MainMenu(Navigable):
 
         self._update_menu_title()
 
-        self._binary_wrapper.invalidate_data()
+        self._reload()
+
+    def _reload(self):
+        """
+            Shows the current report (after a change of report, context or
+            filters): from the report cache, narrowing the loaded tasks down
+            in process or, when neither is possible, loading it again.
+        """
+        key = self._report_key()
+
+        data = self._report_cache.get(key)
+
+        if data is not None:
+            self._data_generation += 1
+
+            self._apply_data(*data)
+        elif not self._refilter(key):
+            self._do_data_update()
+
+        self._selection.clear()
+
+    def _refilter(self, key):
+        """
+            Narrows the loaded tasks down to the current filters, returning
+            False when they must be loaded again.
+        """
+        if self._load_mode != 'export' or self._loaded_tasks is None:
+            return False
+
+        report, context, loaded_filters, version = self._loaded_key
+
+        if (report, context, version) != (key[0], key[1], key[3]):
+            return False
+
+        try:
+            with self._backend_lock:
+                tasks = self._binary_wrapper.refilter(
+                        self._loaded_tasks, self.report, list(loaded_filters),
+                        self.filters)
+        except UnsupportedFilter:
+            return False
+
+        self._data_generation += 1
+
+        data = (tasks, self._report_parser, self._report_parser.format(tasks))
+
+        # The loaded tasks are kept, as they can be narrowed down again
+        self._show_data(*data)
+        self._cache_data(key, data)
+
+        return True
 
     def _update_menu_title(self):
+        if self._snapshot is not None:
+            # Until the report is loaded, as the context may not be known yet
+            if self._snapshot.stamp == file_stamp(self._watched_files):
+                state = 'snapshot'
+            else:
+                state = 'snapshot, data changed since'
+
+            self.main_menu.title = f'[{state}] {self._snapshot.title}'
+
+            return
+
         context = f'Context: {self._get_context() or "<none>"};'
 
         report = f'Report: {self.report}; ' if self.report else ''
 
         filters = f'Filter: {" ".join(self.filters)}; ' if self.filters else ''
 
-        if len(self._data_provider.lines) > 1:
+        if self._tasks:
+            count = len(self._tasks)
+            task_count = f'{count} task' + ('s' if count > 1 else '')
+        elif self._tasks is None and len(self._data_provider.lines) > 1:
             task_count = self._data_provider.lines[-2]
         else:
             task_count = 'no tasks'
 
         title_line = f'{context}{report}{filters}{task_count}'
 
+        self._title_line = title_line
+
         console.set_terminal_title(f'iTask: {title_line}')
 
         self.main_menu.title = f'{title_line}'
 
     def task_del(self):
+        if self._showing_snapshot():
+            return
+
         ids = self._get_selected_ids()
 
         print('cancel  :  -')
@@ -518,9 +958,14 @@ class MainMenu(Navigable):
         else:
             self.report = new_report
 
-        self._binary_wrapper.invalidate_data()
+        self._reload()
 
     def select_context(self):
+        # Only needed here, so launches don't pay for importing it
+        from tabular.factory import TableFactory
+        from tabular.formatters import BoolFormatter
+        from tabular.theme import DefaultTheme
+
         print('Contexts:')
         print()
 
@@ -576,9 +1021,11 @@ class MainMenu(Navigable):
         else:
             self._set_context(new_context)
 
-        self._binary_wrapper.invalidate_data()
+        self._reload()
 
     def _set_context(self, context):
+        self._context = context
+
         self._binary_wrapper.set_context(context)
 
     def _get_context(self):
@@ -595,59 +1042,72 @@ class MainMenu(Navigable):
         console.wait()
 
     # Navigation
-    def activate_next(self):
-        super(MainMenu, self).activate_next()
+    def activate_next(self, count=1):
+        super(MainMenu, self).activate_next(count)
+
+        self._selection.move('down', count)
+
+    def activate_previous(self, count=1):
+        super(MainMenu, self).activate_previous(count)
+
+        self._selection.move('up', count)
 
-        self._selection.move('down', 1)
+    def viewer_down(self, count=1):
+        super(MainMenu, self).viewer_down(count)
 
-    def activate_previous(self):
-        super(MainMenu, self).activate_previous()
+        self._layout.scroll('down', count)
 
-        self._selection.move('up', 1)
+    def viewer_up(self, count=1):
+        super(MainMenu, self).viewer_up(count)
 
-    def viewer_down(self):
-        super(MainMenu, self).viewer_down()
+        self._layout.scroll('up', count)
 
-        self._data_viewer.region.move('down', 1)
-        self._left_viewer.region.move('down', 1)
+    def page_down(self, count=1):
+        super(MainMenu, self).page_down(count)
 
-    def viewer_up(self):
-        super(MainMenu, self).viewer_up()
+        self._move_page(self._data_viewer.region.height * count)
 
-        self._data_viewer.region.move('up', 1)
-        self._left_viewer.region.move('up', 1)
+    def page_up(self, count=1):
+        super(MainMenu, self).page_up(count)
+
+        self._move_page(-self._data_viewer.region.height * count)
+
+    def _move_page(self, lines):
+        # The active line keeps its place on the screen, unless the data ends
+        offset = self._selection.active_line - self._data_viewer.region.top
+
+        self._selection.move('set', self._selection.active_line + lines)
+
+        top = self._selection.active_line - offset
+        diff = top - self._data_viewer.region.top
+
+        self._layout.scroll('down' if diff > 0 else 'up', abs(diff))
 
     def activate_first(self):
         super(MainMenu, self).activate_first()
-        self._data_viewer.region.move('top')
-        self._left_viewer.region.move('top')
+        self._layout.scroll('top')
         self._selection.move('first')
 
     def activate_last(self):
         super(MainMenu, self).activate_last()
-        self._data_viewer.region.move('bottom')
-        self._left_viewer.region.move('bottom')
+        self._layout.scroll('bottom')
         self._selection.move('last')
 
-    def viewer_left(self):
-        super(MainMenu, self).viewer_left()
-        self._data_viewer.region.move('left', 1)
-        self._header_viewer.region.move('left', 1)
+    def viewer_left(self, count=1):
+        super(MainMenu, self).viewer_left(count)
+        self._layout.scroll('left', count)
 
-    def viewer_right(self):
-        super(MainMenu, self).viewer_right()
-        self._data_viewer.region.move('right', 1)
-        self._header_viewer.region.move('right', 1)
+    def viewer_right(self, count=1):
+        super(MainMenu, self).viewer_right(count)
+        self._layout.scroll('right', count)
 
     def viewer_begin(self):
         super(MainMenu, self).viewer_begin()
-        self._data_viewer.region.move('begin')
-        self._header_viewer.region.move('begin')
+        self._layout.scroll('begin')
 
     def viewer_end(self):
         super(MainMenu, self).viewer_end()
-        self._data_viewer.region.move('end')
-        self._header_viewer.region.move('end')
+        self._layout.scroll('end')
 
     # Selection
     def toggle_selected(self):
@@ -655,6 +1115,84 @@ class MainMenu(Navigable):
 
         self._selection.toggle_active_line_selected()
 
+    # Search
+    def _searchable_lines(self):
+        return range(self._first_data_line,
+                     len(self._data_provider.lines) -
+                     self._layout.trailing_lines)
+
+    def _search_changed(self):
+        self._left_viewer.invalidate()
+        self._data_viewer.invalidate()
+
+    def search(self):
+        super(MainMenu, self).search()
+
+        start_line = self._selection.active_line
+
+        def changed(query):
+            matches = self._search.update(query)
+
+            self._search_changed()
+
+            # Like vim's incsearch: the first match from where the search
+            # started, or back there while nothing matches
+            line = self._search.next(start_line - 1)
+            self._selection.move('set', start_line if line is None else line)
+
+            return '[{} matches]'.format(len(matches)) if query else ''
+
+        def finished(query):
+            if query is None:
+                self._search.clear()
+
+                self._search_changed()
+
+                self._selection.move('set', start_line)
+
+        self.main_menu.start_prompt(Prompt('/', changed, finished))
+
+    def search_next(self, count=1):
+        super(MainMenu, self).search_next(count)
+
+        if not self._search.matches:
+            return
+
+        line = self._selection.active_line
+
+        for _ in range(count):
+            line = self._search.next(line)
+
+        self._selection.move('set', line)
+
+    def search_previous(self, count=1):
+        super(MainMenu, self).search_previous(count)
+
+        if not self._search.matches:
+            return
+
+        line = self._selection.active_line
+
+        for _ in range(count):
+            line = self._search.previous(line)
+
+        self._selection.move('set', line)
+
+    def toggle_range_selected(self):
+        super(MainMenu, self).toggle_range_selected()
+
+        self._selection.toggle_range()
+
+    def invert_selection(self):
+        super(MainMenu, self).invert_selection()
+
+        self._selection.invert()
+
+    def select_all(self):
+        super(MainMenu, self).select_all()
+
+        self._selection.select_all()
+
 
 def parse_command_line():
     parser = argparse.ArgumentParser(prog='iTask')
@@ -669,6 +1207,32 @@ def parse_command_line():
 
     parser.add_argument('-c', '--context', help='Initial context')
 
+    parser.add_argument('-m', '--load-mode', choices=['report', 'export'],
+                        default='report', help='How reports are loaded: ' +
+                        'scraping the text report or from "task export" ' +
+                        'records')
+
+    parser.add_argument('-b', '--backend',
+                        choices=['cli', 'native', 'fake', 'daemon'],
+                        default='cli', help='Where tasks come from: the ' +
+                        'task binary, the Taskwarrior data files, a ' +
+                        'generated in memory dataset or a running itask ' +
+                        'daemon (falling back to the task binary)')
+
+    parser.add_argument('--fake-tasks', type=int, default=1000,
+                        help='Number of tasks generated by the fake backend')
+
+    parser.add_argument('--fake-latency', type=float, default=0,
+                        help='Milliseconds each fake backend call takes')
+
+    parser.add_argument('--no-snapshot', dest='snapshot',
+                        action='store_false', help='Don\'t paint the ' +
+                        'report shown by the last run while it is loaded')
+
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep the backend loaded in the background, ' +
+                        'serving "--backend daemon" runs')
+
     parser.add_argument('--rofi', action='store_true',
                         help='Open rofi selection menu')
 
@@ -696,22 +1260,50 @@ def recall_it_self_inside_terminal():
     subprocess.run([terminal, '-e', ' '.join(arguments)])
 
 
+def create_backend(args):
+    if args.backend == 'native':
+        return NativeTaskwarriorWrapper(args.task_data, args.context)
+    elif args.backend == 'fake':
+        return FakeBackend(args.fake_tasks, args.fake_latency / 1000,
+                           args.context)
+    elif args.backend == 'daemon':
+        return DaemonClient(args.task_data, args.context)
+    else:
+        return TaskwarriorWrapper(args.task_data, args.context)
+
+
 def main():
     args = parse_command_line()
 
-    taskwarrior_wrapper = TaskwarriorWrapper(args.task_data, args.context)
+    taskwarrior_wrapper = create_backend(args)
+
+    if args.daemon:
+        # It would connect to itself
+        if args.backend == 'daemon':
+            sys.exit('--daemon needs a backend other than "daemon"')
+
+        try:
+            Daemon(taskwarrior_wrapper).serve()
+        except KeyboardInterrupt:
+            pass
+        except DaemonError as e:
+            sys.exit(str(e))
+
+        return
 
     if args.rofi:
         from . import rofi
 
         rofi = rofi.Rofi()
 
-        contexts = taskwarrior_wrapper.contexts()
+        contexts = [context['name']
+                    for context in taskwarrior_wrapper.contexts()]
 
         result = rofi.select(options=contexts, prompt='Context')[0]
 
         if result != -1:
             args.context = contexts[result]
+            taskwarrior_wrapper.set_context(args.context)
 
         all_reports = taskwarrior_wrapper.reports()
 
@@ -720,7 +1312,7 @@ def main():
             .get_config('itask.ignored_reports', '')
         ignored_reports = ignored_reports.split(',')
 
-        reports = dict()
+        reports = []
 
         for report in all_reports.keys():
             if report not in ignored_reports:
@@ -736,6 +1328,10 @@ def main():
 
         return
 
+    # Configuration and first report load run while the GUI is being built
+    filters = args.filter.split(' ') if args.filter else None
+    taskwarrior_wrapper.prefetch(args.report, filters, args.load_mode)
+
     handler = MainMenu(taskwarrior_wrapper, args)
 
     handler.run()
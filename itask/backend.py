@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import shutil
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from itask.reportformatter import ReportFormatter
+from itask.taskfilter import TaskFilter, TaskIndex, UnsupportedFilter, \
+    narrowing
+
+
+class Backend(ABC):
+    """
+        Everything MainMenu needs from Taskwarrior: loading reports, changing
+        tasks, listing reports and contexts and reading the configuration.
+
+        Subclasses must implement config(), _export() and the mutations; the
+        rest is built on top of them. Mutations must fire 'data changed'.
+    """
+
+    def __init__(self, context=None):
+        # TODO Its possible to improve this with more specific events
+        self._listeners = {'data changed': []}
+
+        # None means the context set on taskrc
+        self._context = context
+
+        self._prefetched = dict()
+        self.register_listener('data changed', self._drop_prefetched)
+
+        # TaskIndex of the last task list filtered in process
+        self._task_index = None
+        self.register_listener('data changed', self._drop_task_index)
+
+        # (limited, tasks): the last report evaluated in process before and
+        # after its limit, so refilter() can narrow down all of its tasks
+        self._unlimited = None
+
+    # Listeners
+    def register_listener(self, event, listener):
+        self._listeners[event].append(listener)
+
+    def remove_listener(self, event, listener):
+        self._listeners[event].remove(listener)
+
+    def _notify_listeners(self, event, *args, **kwargs):
+        for listener in self._listeners[event]:
+            listener(origin=self, *args, **kwargs)
+
+    def invalidate_data(self):
+        self._notify_listeners('data changed')
+
+    def watched_files(self):
+        """
+            Files which change when the data is changed outside of the backend
+            (by another "task" run, a sync...).
+        """
+        return []
+
+    # Startup
+    def prefetch(self, report=None, filters=None, load_mode=None):
+        """
+            Starts the queries needed before the first frame on background
+            threads, so they run concurrently with each other and with the
+            rest of the startup. load() or export() with the same arguments
+            waits for the prefetched result instead of querying again.
+
+            load_mode: "report" (prefetch load()), "export" (prefetch
+                export()) or None (prefetch only the configuration).
+        """
+        executor = ThreadPoolExecutor(max_workers=2)
+
+        executor.submit(self.config)
+
+        if load_mode == 'export':
+            key = ('export', report, tuple(filters or []))
+            self._prefetched[key] = executor.submit(self._export, report,
+                                                    filters)
+        elif load_mode == 'report':
+            key = ('load', report, tuple(filters or []))
+            self._prefetched[key] = executor.submit(self._load, report,
+                                                    filters)
+
+        executor.shutdown(wait=False)
+
+    def _take_prefetched(self, method, report, filters):
+        future = self._prefetched.pop((method, report, tuple(filters or [])),
+                                      None)
+
+        return future.result() if future else None
+
+    def _drop_prefetched(self, origin):
+        self._prefetched.clear()
+
+    # Configuration
+    @abstractmethod
+    def config(self):
+        """
+            Returns a ConfigSnapshot with the whole Taskwarrior configuration.
+        """
+        raise NotImplementedError()
+
+    def get_config(self, config, default=None):
+        return self.config().get(config) or default
+
+    def get_external_context(self):
+        context = self.config().get('context')
+
+        if not context or context == 'none':
+            return None
+
+        return context
+
+    def get_context(self):
+        if self._context is None:
+            return self.get_external_context()
+
+        return self._context
+
+    def set_context(self, context):
+        self._context = context
+
+    def contexts(self):
+        raw = self.config().prefixed('context.')
+
+        current = self.get_context()
+
+        contexts_ = dict()
+
+        for key, value in sorted(raw.items()):
+            tokens = key.split('.')
+            name = tokens[0]
+
+            active = current == name
+
+            context = contexts_.setdefault(name, {'name': name,
+                                                  'active': active})
+
+            # Contexts created before Taskwarrior 2.6 have only a read filter
+            prop = tokens[1] if len(tokens) > 1 else 'read'
+
+            context[prop] = value
+
+        return contexts_.values()
+
+    def reports(self):
+        raw = self.config().prefixed('report.')
+
+        reports = dict()
+
+        for key, value in sorted(raw.items()):
+            report, _, prop = key.rpartition('.')
+
+            if prop == 'description':
+                reports[report] = value
+
+        return reports
+
+    def _report_name(self, report):
+        if report:
+            return report
+
+        return self.get_config('default.command', 'next').split(' ')[0]
+
+    def report_columns(self, report):
+        report = self._report_name(report)
+
+        columns = self.get_config(f'report.{report}.columns', '')
+        labels = self.get_config(f'report.{report}.labels', '')
+
+        columns = [column for column in columns.split(',') if column]
+        labels = [label for label in labels.split(',') if label]
+
+        return columns, labels
+
+    # Loading
+    def load(self, report, filters):
+        """
+            Returns the report as text, in the same layout "task <report>"
+            prints it.
+        """
+        prefetched = self._take_prefetched('load', report, filters)
+
+        if prefetched is not None:
+            return prefetched
+
+        return self._load(report, filters)
+
+    def _load(self, report, filters):
+        tasks = self._export(report, filters)
+
+        return ReportFormatter(*self.report_columns(report)).format(tasks)
+
+    def load_stream(self, report, filters):
+        """
+            Yields the lines of load() (without line breaks) as soon as each
+            one is available.
+        """
+        prefetched = self._take_prefetched('load', report, filters)
+
+        if prefetched is not None:
+            yield from prefetched.split('\n')
+        else:
+            yield from self._load_stream(report, filters)
+
+    def _load_stream(self, report, filters):
+        yield from self._load(report, filters).split('\n')
+
+    def export(self, report, filters):
+        """
+            Returns the tasks shown by report, as a list of TaskRecords.
+        """
+        prefetched = self._take_prefetched('export', report, filters)
+
+        if prefetched is not None:
+            return prefetched
+
+        return self._export(report, filters)
+
+    @abstractmethod
+    def _export(self, report, filters):
+        raise NotImplementedError()
+
+    def _report_filter(self, report, filters):
+        """
+            Returns the filter tokens of report, with the context read filter
+            and filters appended, each in its own parentheses as task does.
+        """
+        report = self._report_name(report)
+
+        groups = [self.get_config(f'report.{report}.filter', '').split()]
+
+        context = self.get_context()
+
+        if context:
+            read_filter = self.get_config(f'context.{context}.read') or \
+                self.get_config(f'context.{context}')
+
+            if read_filter:
+                groups.append(read_filter.split())
+
+        groups.append(filters or [])
+
+        tokens = []
+
+        for group in groups:
+            if group:
+                tokens += ['('] + group + [')']
+
+        return tokens
+
+    def _sort(self, tasks, report):
+        report = self._report_name(report)
+
+        sort = self.get_config(f'report.{report}.sort', '')
+
+        for sort_key in reversed([key for key in sort.split(',') if key]):
+            sort_key = sort_key.rstrip('/')
+            descending = sort_key.endswith('-')
+            attribute = sort_key.rstrip('+-')
+
+            present = [task for task in tasks
+                       if task.get(attribute) is not None]
+            absent = [task for task in tasks
+                      if task.get(attribute) is None]
+
+            present.sort(key=lambda task: task.get(attribute),
+                         reverse=descending)
+
+            tasks = present + absent
+
+        return tasks
+
+    def _evaluate_report(self, tasks, report, filters):
+        """
+            Applies report filter, sort and limit to tasks in process. Raises
+            UnsupportedFilter when the filter can't be evaluated here.
+        """
+        task_filter = TaskFilter(self._report_filter(report, filters))
+
+        tasks = self._sort(task_filter.select(tasks, self._index(tasks)),
+                           report)
+
+        limited = self._limit(tasks, task_filter.limit)
+
+        if limited is not tasks:
+            self._unlimited = (limited, tasks)
+
+        return limited
+
+    def _limit(self, tasks, limit):
+        size = self._limit_size(limit)
+
+        return tasks[:size] if size is not None else tasks
+
+    def _limit_size(self, limit):
+        """
+            Returns the number of tasks limit (the value of a "limit:" term)
+            lets through, or None.
+        """
+        if limit == 'page':
+            return shutil.get_terminal_size().lines - 7
+        elif limit and limit.isdigit():
+            return int(limit)
+
+        return None
+
+    def _index(self, tasks):
+        """
+            Returns the TaskIndex of tasks, reused while the same list is
+            filtered again.
+        """
+        index = self._task_index
+
+        if index is None or index.tasks is not tasks:
+            index = self._task_index = TaskIndex(tasks)
+
+        return index
+
+    def _drop_task_index(self, origin):
+        self._task_index = None
+        self._unlimited = None
+
+    def refilter(self, tasks, report, loaded_filters, filters):
+        """
+            Returns export(report, filters) computed in process from tasks,
+            the result of export(report, loaded_filters), without querying
+            the data again: filters must be loaded_filters with more terms
+            which can only narrow it down.
+
+            Raises UnsupportedFilter when that's not the case or when the
+            filter can't be evaluated here; export() must be used then.
+        """
+        if not narrowing(loaded_filters, filters):
+            raise UnsupportedFilter(' '.join(filters or []))
+
+        task_filter = TaskFilter(self._report_filter(report, filters))
+
+        size = self._limit_size(task_filter.limit)
+
+        # Whether tasks has every task of the report (the limit cut none)
+        complete = size is None or len(tasks) < size
+
+        if self._unlimited is not None and self._unlimited[0] is tasks:
+            tasks = self._unlimited[1]
+            complete = True
+
+        tasks_matching = task_filter.select(tasks, self._index(tasks))
+
+        if size is None:
+            return tasks_matching
+
+        # tasks is sorted as the result, so the tasks matching are the first
+        # ones of the result; the ones the limit cut could be missing, unless
+        # there are enough already
+        if complete or len(tasks_matching) >= size:
+            return tasks_matching[:size]
+
+        raise UnsupportedFilter('limit:' + task_filter.limit)
+
+    # Mutations
+    @abstractmethod
+    def add(self, parameters):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def annotate(self, id, annotation):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def done(self, ids):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def view(self, ids):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def mod(self, ids, modifications):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, ids, comment):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def undo(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def sync(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def projects(self):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def tags(self):
+        raise NotImplementedError()
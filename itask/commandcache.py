@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+
+
+class CommandCache(object):
+    """
+        Memoizes results of read-only commands. An entry is only reused while
+        the modification times of all watched files are the same they were
+        when the entry was stored.
+
+        It is safe to use from several threads: a call for a command which is
+        already running elsewhere waits for it instead of running it again.
+    """
+
+    def __init__(self, watched_files):
+        """
+            watched_files: List of paths whose modification invalidates the
+                cached entries (they don't need to exist).
+        """
+        self._watched_files = list(watched_files)
+        self._entries = dict()
+        self._running = dict()
+        self._lock = threading.Lock()
+
+    def _stamp(self):
+        stamp = []
+
+        for file_name in self._watched_files:
+            try:
+                stamp.append(os.stat(file_name).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+
+        return tuple(stamp)
+
+    def get(self, args, producer):
+        """
+            Returns the cached result for args, calling producer() to create
+            it when there is no valid entry.
+        """
+        key = tuple(args)
+
+        while True:
+            with self._lock:
+                stamp = self._stamp()
+
+                entry = self._entries.get(key)
+
+                if entry and entry[0] == stamp:
+                    return entry[1]
+
+                running = self._running.get(key)
+
+                if running is None:
+                    running = threading.Event()
+                    self._running[key] = running
+
+                    break
+
+            running.wait()
+
+        try:
+            result = producer()
+
+            with self._lock:
+                self._entries[key] = (stamp, result)
+        finally:
+            with self._lock:
+                del self._running[key]
+
+            running.set()
+
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
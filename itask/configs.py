@@ -14,7 +14,16 @@ def load():
     with open(config_file) as file:
         user_configs = yaml.safe_load(file) or {}
 
-    _configs.update(user_configs)
+    _merge(_configs, user_configs)
+
+
+def _merge(configs, overrides):
+    # Sections are merged, so a user file doesn't need to repeat every key
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(configs.get(key), dict):
+            _merge(configs[key], value)
+        else:
+            configs[key] = value
 
 
 def _get_config_file():
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+
+_include_pattern = re.compile(r'^\s*include\s+(.*?)\s*$')
+
+
+class ConfigSnapshot(object):
+    """
+        All Taskwarrior configuration entries, as printed by "task _show"
+        (one "key=value" per line).
+    """
+
+    def __init__(self, entries):
+        self._entries = entries
+
+    @classmethod
+    def parse(cls, raw):
+        entries = dict()
+
+        for line in raw.split('\n'):
+            key, separator, value = line.partition('=')
+
+            if separator:
+                entries[key] = value
+
+        return cls(entries)
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def prefixed(self, prefix):
+        """
+            Returns a dictionary with all entries whose key starts with prefix
+            (e.g. "context."), keyed by the rest of the key.
+        """
+        return {key[len(prefix):]: value
+                for key, value in self._entries.items()
+                if key.startswith(prefix)}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+def include_chain(taskrc):
+    """
+        Returns taskrc followed by every existing file it includes,
+        recursively.
+    """
+    files = []
+    pending = [taskrc]
+
+    while pending:
+        file_name = pending.pop(0)
+
+        if file_name in files:
+            continue
+
+        files.append(file_name)
+
+        try:
+            with open(file_name) as file:
+                lines = file.readlines()
+        except OSError:
+            continue
+
+        base_folder = os.path.dirname(file_name)
+
+        for line in lines:
+            match = _include_pattern.match(line)
+
+            if not match:
+                continue
+
+            included = os.path.expanduser(os.path.expandvars(match.group(1)))
+            included = os.path.join(base_folder, included)
+
+            if os.path.exists(included):
+                pending.append(included)
+
+    return files
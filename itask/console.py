@@ -1,52 +1,268 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import atexit
+import contextlib
+import functools
+import os
+import select
+import signal
 import sys
 
 SEQUENCE_ESCAPES = {
     'blue background': b'\033[48;5;4m',
     'cyan background': b'\033[48;5;12m',
     'white background': b'\033[30;47m',
-    'color reset': b'\033[0m'}
+    'search match': b'\033[30;43m',
+    'color reset': b'\033[0m',
+    'begin synchronized update': b'\033[?2026h',
+    'end synchronized update': b'\033[?2026l'}
+
+# Output of the frame being composed, None when there is no frame
+_frame = None
+
+
+def begin_frame():
+    """
+        Starts collecting everything written through write() (and the
+        functions below) in memory, until end_frame().
+    """
+    global _frame
+    _frame = bytearray()
+
+
+def end_frame():
+    """
+        Sends the frame to the terminal as a single synchronized update, in
+        one write and one flush.
+    """
+    global _frame
+    frame, _frame = _frame, None
+
+    if not frame:
+        return
+
+    # Whatever was printed before the frame must reach the terminal first
+    sys.stdout.flush()
+
+    sys.stdout.buffer.write(
+            SEQUENCE_ESCAPES['begin synchronized update'] + frame +
+            SEQUENCE_ESCAPES['end synchronized update'])
+    sys.stdout.buffer.flush()
+
+
+def write(data):
+    if _frame is not None:
+        _frame.extend(data)
+    else:
+        sys.stdout.buffer.write(data)
+
+
+def write_text(text):
+    write(text.encode(sys.stdout.encoding))
+
+
+@functools.lru_cache(maxsize=4096)
+def cursor_position(x, y):
+    """
+        Returns the escape sequence moving the cursor to column x, line y (1
+        indexed).
+    """
+    return '\033[{};{}H'.format(y, x).encode('ascii')
 
 
 def move_cursor(x, y):
-    sys.stdout.buffer.write('\033[{};{}H'.format(
-        y, x).encode(sys.stdout.encoding))
+    write(cursor_position(x, y))
+
+
+def scroll_lines(top, bottom, count):
+    """
+        Shifts the content of screen lines top..bottom (1 indexed, inclusive)
+        using a scroll region: up count lines when count is positive, down
+        when it is negative. Lines scrolled in are blank.
+    """
+    if count > 0:
+        move = '\033[{};1H'.format(bottom) + '\033D' * count
+    else:
+        move = '\033[{};1H'.format(top) + '\033M' * -count
+
+    sequence = '\033[{};{}r{}\033[r'.format(top, bottom, move)
+
+    write(sequence.encode('ascii'))
 
 
 def clear_screen():
-    sys.stdout.buffer.write(b'\033[2J\033[1;1H')
-    sys.stdout.flush()
+    write(b'\033[2J\033[1;1H')
+
+    if _frame is None:
+        sys.stdout.flush()
 
 
 def change_cursor_visibility(visible):
     if visible:
-        sys.stdout.buffer.write(b'\033[?25h')
+        write(b'\033[?25h')
+    else:
+        write(b'\033[?25l')
+
+
+try:
+    import termios
+except ImportError:
+    termios = None
+
+
+def _read_char(fd):
+    """
+        Reads one UTF-8 encoded character straight from fd (bypassing the
+        sys.stdin buffer).
+    """
+    first = os.read(fd, 1)
+
+    if not first:
+        return ''
+
+    if first[0] >= 0xf0:
+        length = 4
+    elif first[0] >= 0xe0:
+        length = 3
+    elif first[0] >= 0xc0:
+        length = 2
     else:
-        sys.stdout.buffer.write(b'\033[?25l')
+        length = 1
+
+    raw = first
+
+    while len(raw) < length:
+        raw += os.read(fd, length - len(raw))
+
+    return raw.decode(errors='replace')
+
+
+def _raw_mode(mode):
+    """
+        Returns a copy of mode like tty.setraw() does, but keeping output
+        processing, so a line feed still returns to the first column.
+    """
+    mode = list(mode)
+    mode[6] = list(mode[6])
+
+    mode[0] &= ~(termios.BRKINT | termios.ICRNL | termios.INPCK |
+                 termios.ISTRIP | termios.IXON)
+    mode[2] &= ~(termios.CSIZE | termios.PARENB)
+    mode[2] |= termios.CS8
+    mode[3] &= ~(termios.ECHO | termios.ICANON | termios.IEXTEN |
+                 termios.ISIG)
+    mode[6][termios.VMIN] = 1
+    mode[6][termios.VTIME] = 0
+
+    return mode
+
+
+class TerminalSession(object):
+    """
+        Keeps the terminal in raw mode (no echo, no line buffering) from
+        enter() to leave(), so reading a key doesn't need to change the
+        terminal mode every time.
+
+        The original mode is restored around interactive prompts (see
+        suspended()), at exit and on SIGTERM/SIGHUP.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if TerminalSession._instance is None:
+            TerminalSession._instance = object.__new__(cls)
+            TerminalSession._instance._initialized = False
+
+        return TerminalSession._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        self._fd = None
+        self._original_mode = None
+        self._active = False
+
+    @property
+    def active(self):
+        return self._active
+
+    def enter(self):
+        if self._active or termios is None or not os.isatty(0):
+            return
+
+        if self._original_mode is None:
+            self._fd = sys.stdin.fileno()
+            self._original_mode = termios.tcgetattr(self._fd)
+
+            atexit.register(self.leave)
+
+            for signal_number in (signal.SIGTERM, signal.SIGHUP):
+                signal.signal(signal_number, self._terminated)
+
+        termios.tcsetattr(self._fd, termios.TCSADRAIN,
+                          _raw_mode(self._original_mode))
+
+        self._active = True
+
+    def leave(self):
+        if not self._active:
+            return
+
+        termios.tcsetattr(self._fd, termios.TCSADRAIN, self._original_mode)
+
+        self._active = False
+
+    @contextlib.contextmanager
+    def suspended(self):
+        """
+            Restores the original terminal mode while the block runs (to read
+            input with echo and line editing, or to run other programs).
+        """
+        was_active = self._active
+
+        self.leave()
+
+        try:
+            yield
+        finally:
+            if was_active:
+                self.enter()
+
+    def _terminated(self, signal_number, stack):
+        self.leave()
+
+        signal.signal(signal_number, signal.SIG_DFL)
+        os.kill(os.getpid(), signal_number)
+
+    def getch(self):
+        return _read_char(self._fd)
 
 
 def _find_getch():
-    try:
-        import termios
-    except ImportError:
+    if termios is None:
         # Non-POSIX. Return msvcrt's (Windows') getch.
         import msvcrt
         return msvcrt.getch
 
     # POSIX system. Create and return a getch that manipulates the tty.
-    import sys
-    import tty
-
     def _getch():
+        session = TerminalSession()
+
+        if session.active:
+            return session.getch()
+
         fd = sys.stdin.fileno()
-        old_settings = tty.tcgetattr(fd)
+        old_settings = termios.tcgetattr(fd)
         try:
-            tty.setraw(fd)
-            ch = sys.stdin.read(1)
+            termios.tcsetattr(fd, termios.TCSADRAIN, _raw_mode(old_settings))
+            ch = _read_char(fd)
         finally:
-            tty.tcsetattr(fd, tty.TCSADRAIN, old_settings)
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
 
         return ch
 
@@ -56,23 +272,36 @@ def _find_getch():
 getch = _find_getch()
 
 
+def input_pending():
+    """
+        Tells whether there are keys typed ahead, so getch() won't block.
+    """
+    readable, _, _ = select.select([sys.stdin.fileno()], [], [], 0)
+
+    return bool(readable)
+
+
 def wait(message='Press any key to continue...'):
     print(message)
+    sys.stdout.flush()
     getch()
 
 
 def change_getch_echo(enabled):
-    import os
-    import platform
+    if termios is None or not os.isatty(0):
+        # TODO Implement on Windows...
+        return
 
-    if platform.system() == 'Linux':
-        if enabled:
-            os.system('stty echo')
-        else:
-            os.system('stty -echo')
+    fd = sys.stdin.fileno()
+    mode = termios.tcgetattr(fd)
+
+    if enabled:
+        mode[3] |= termios.ECHO
+    else:
+        mode[3] &= ~termios.ECHO
 
-    # TODO Implement on Windows...
+    termios.tcsetattr(fd, termios.TCSADRAIN, mode)
 
 
 def set_terminal_title(title):
-    sys.stdout.buffer.write("\x1b]2;{}\x07".format(title).encode("utf-8"))
+    write("\x1b]2;{}\x07".format(title).encode("utf-8"))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import signal
+import socket
+import sys
+import tempfile
+
+from itask.eventloop import EventLoop
+
+# Seconds a client has to send its request
+REQUEST_TIMEOUT = 5.0
+
+# Seconds a client waits for the daemon, which serves one request at a time,
+# before giving up (and running task itself)
+RESPONSE_TIMEOUT = 10.0
+
+
+def socket_path():
+    """
+        Path of the daemon socket, in a directory only the user can access
+        ($XDG_RUNTIME_DIR, or one made for itask in the temporary directory).
+    """
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+
+    if not directory:
+        directory = os.path.join(tempfile.gettempdir(),
+                                 f'itask-{os.getuid()}')
+
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    return os.path.join(directory, 'itask.sock')
+
+
+class DaemonError(Exception):
+    pass
+
+
+def request(path, method, **arguments):
+    """
+        Sends a request to the daemon listening on path, returning its result.
+        Raises OSError when there is no daemon and DaemonError when the
+        request failed.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        # socket.timeout is an OSError too
+        connection.settimeout(RESPONSE_TIMEOUT)
+
+        connection.connect(path)
+
+        message = {'method': method, 'arguments': arguments}
+        connection.sendall(json.dumps(message).encode() + b'\n')
+
+        connection.shutdown(socket.SHUT_WR)
+
+        chunks = []
+
+        while True:
+            chunk = connection.recv(65536)
+
+            if not chunk:
+                break
+
+            chunks.append(chunk)
+
+    try:
+        response = json.loads(b''.join(chunks))
+    except ValueError:
+        raise DaemonError('Invalid response')
+
+    if 'error' in response:
+        raise DaemonError(response['error'])
+
+    return response.get('result')
+
+
+class Daemon(object):
+    """
+        Keeps a backend (its configuration, tasks and report caches) alive
+        between itask runs, serving its read only calls to DaemonClients over
+        a Unix socket. Mutations aren't served: clients run them and the
+        daemon notices the data files changing.
+
+        Each connection carries one request, a JSON object with "method" and
+        "arguments" ended by a line break, and gets one response back:
+        {"result": ...} or {"error": "message"}.
+    """
+
+    def __init__(self, backend, path=None):
+        self._backend = backend
+        self._path = path or socket_path()
+
+        self._socket = None
+
+        self._methods = {
+                'ping': self._ping,
+                'config': self._config,
+                'load': self._load,
+                'export': self._export,
+                }
+
+    def serve(self):
+        """
+            Listens until interrupted.
+        """
+        self._listen()
+
+        loop = EventLoop()
+
+        loop.add_reader(self._socket.fileno(), self._accept)
+
+        try:
+            # Stopped with kill as with ^C, so the socket is removed
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+            loop.watch_files(self._backend.watched_files(),
+                             self._data_files_changed)
+
+            self._warm_up()
+
+            loop.run()
+        finally:
+            loop.remove_reader(self._socket.fileno())
+
+            self._socket.close()
+
+            os.unlink(self._path)
+
+    def _listen(self):
+        if os.path.exists(self._path):
+            try:
+                request(self._path, 'ping')
+            except OSError:
+                # Left behind by a daemon which didn't exit cleanly
+                os.unlink(self._path)
+            else:
+                raise DaemonError(f'Already running on {self._path}')
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(self._path)
+        os.chmod(self._path, 0o600)
+
+        self._socket.listen()
+
+    def _warm_up(self):
+        """
+            Loads what the first client is going to ask for: the configuration
+            and the tasks of the default report. Raises DaemonError when the
+            backend fails.
+        """
+        try:
+            self._backend.config()
+            self._backend.export(None, None)
+        except Exception as e:
+            raise DaemonError(f'Loading the tasks failed: {e}')
+
+    def _data_files_changed(self):
+        self._backend.invalidate_data()
+
+        # Requests still get the error of the backend, if it keeps failing
+        try:
+            self._warm_up()
+        except DaemonError as e:
+            print(e, file=sys.stderr)
+
+    def _accept(self):
+        connection, _ = self._socket.accept()
+
+        with connection:
+            connection.settimeout(REQUEST_TIMEOUT)
+
+            try:
+                response = self._handle(self._read_request(connection))
+
+                connection.sendall(json.dumps(response).encode())
+            except OSError:
+                # The client went away or didn't send its request in time
+                pass
+
+    def _read_request(self, connection):
+        data = b''
+
+        while not data.endswith(b'\n'):
+            chunk = connection.recv(65536)
+
+            if not chunk:
+                break
+
+            data += chunk
+
+        return data
+
+    def _handle(self, data):
+        try:
+            message = json.loads(data)
+
+            method = self._methods[message['method']]
+            arguments = message.get('arguments', {})
+        except (ValueError, KeyError, TypeError):
+            return {'error': 'Invalid request'}
+
+        try:
+            return {'result': method(**arguments)}
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+
+    def _check(self, task_data, taskrc):
+        """
+            Checks the request is for the data and the configuration the
+            backend reads.
+        """
+        for name, requested in (('data_location', task_data),
+                                ('taskrc_file', taskrc)):
+            served = getattr(self._backend, name, None)
+
+            if requested and served and served() != requested:
+                raise DaemonError(f'Serving {served()}, not {requested}')
+
+    def _use(self, task_data, taskrc, context):
+        """
+            Checks the request (see _check()), and sets the context of the
+            client.
+        """
+        self._check(task_data, taskrc)
+
+        self._backend.set_context(context)
+
+    # Methods
+    def _ping(self):
+        return 'pong'
+
+    def _config(self, task_data=None, taskrc=None):
+        self._check(task_data, taskrc)
+
+        return self._backend.config().prefixed('')
+
+    def _load(self, report=None, filters=None, task_data=None, taskrc=None,
+              context=None):
+        self._use(task_data, taskrc, context)
+
+        return self._backend.load(report, filters)
+
+    def _export(self, report=None, filters=None, task_data=None,
+                taskrc=None, context=None):
+        self._use(task_data, taskrc, context)
+
+        # IDs and urgency are computed by some backends, instead of read
+        return [dict(task.attributes, id=task.id, urgency=task.urgency)
+                for task in self._backend.export(report, filters)]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from itask.configsnapshot import ConfigSnapshot
+from itask.daemon import DaemonError, request, socket_path
+from itask.taskrecord import TaskRecord
+from itask.taskwarriorwrapper import TaskwarriorWrapper
+
+
+class DaemonClient(TaskwarriorWrapper):
+    """
+        Gets the configuration and the reports from a running Daemon, which
+        has them ready, instead of running task. Without a daemon (or with
+        one serving other data) it runs task like TaskwarriorWrapper.
+
+        Mutations always run task here; the daemon notices the data files
+        changing.
+    """
+
+    def __init__(self, task_data=None, context=None, binary=None,
+                 path=None):
+        super(DaemonClient, self).__init__(task_data, context, binary)
+
+        self._path = path or socket_path()
+
+    def _request(self, method, **arguments):
+        return request(self._path, method, **arguments)
+
+    def _location(self):
+        """
+            What the daemon must be serving to answer this client.
+        """
+        return {'task_data': self.data_location(),
+                'taskrc': self.taskrc_file()}
+
+    def _report_request(self, method, report, filters):
+        return self._request(method, report=report, filters=filters,
+                             context=self._context, **self._location())
+
+    def _load_config(self):
+        try:
+            return ConfigSnapshot(self._request('config', **self._location()))
+        except (OSError, DaemonError):
+            return super(DaemonClient, self)._load_config()
+
+    def _load(self, report, filters):
+        try:
+            return self._report_request('load', report, filters)
+        except (OSError, DaemonError):
+            return super(DaemonClient, self)._load(report, filters)
+
+    def _load_stream(self, report, filters):
+        try:
+            text = self._report_request('load', report, filters)
+        except (OSError, DaemonError):
+            yield from super(DaemonClient, self)._load_stream(report,
+                                                              filters)
+        else:
+            yield from text.split('\n')
+
+    def _export(self, report, filters):
+        try:
+            entries = self._report_request('export', report, filters)
+        except (OSError, DaemonError):
+            return super(DaemonClient, self)._export(report, filters)
+
+        return [TaskRecord(entry) for entry in entries]
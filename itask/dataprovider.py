@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from array import array
+from bisect import bisect_right
+
+
 class DataSize(object):
 
     def __init__(self, lines, largest_line):
@@ -10,21 +14,157 @@ class DataSize(object):
         self.largest_line = largest_line
 
 
+class LineBuffer(object):
+    """
+        Read only sequence of lines stored as one UTF-8 buffer plus an index
+        of line end offsets. Lines are only decoded when accessed.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._ends = array('I')
+
+    def clear(self):
+        del self._buffer[:]
+        del self._ends[:]
+
+    def append(self, raw_line):
+        """
+            raw_line: The encoded line, without the line break.
+        """
+        self._buffer += raw_line
+        self._ends.append(len(self._buffer))
+
+    def extend(self, raw_stream):
+        """
+            Appends every line of raw_stream (encoded, lines separated by
+            b'\\n'), returning the byte length of each one.
+        """
+        start = len(self._buffer)
+
+        self._buffer += raw_stream.replace(b'\n', b'')
+
+        lengths = [len(raw_line) for raw_line in raw_stream.split(b'\n')]
+
+        for length in lengths:
+            start += length
+            self._ends.append(start)
+
+        return lengths
+
+    def raw(self, index):
+        """
+            Returns the encoded line at index, without decoding it.
+        """
+        if index < 0:
+            index += len(self._ends)
+
+        if index not in range(len(self._ends)):
+            raise IndexError('line index out of range')
+
+        start = self._ends[index - 1] if index > 0 else 0
+
+        return bytes(self._buffer[start:self._ends[index]])
+
+    def lower(self):
+        """
+            Returns a copy with the ASCII letters in lower case (to search
+            ignoring case).
+        """
+        copy = LineBuffer()
+        copy._buffer = self._buffer.lower()
+        copy._ends = array('I', self._ends)
+
+        return copy
+
+    def find(self, needle, lines=None):
+        """
+            Returns the indexes (in order) of the lines containing needle (an
+            encoded, non empty string), among lines (every line by default).
+        """
+        buffer = self._buffer
+        ends = self._ends
+
+        if lines is not None:
+            return [index for index in lines
+                    if buffer.find(needle, ends[index - 1] if index else 0,
+                                   ends[index]) >= 0]
+
+        found = []
+
+        position = buffer.find(needle)
+
+        while position >= 0:
+            index = bisect_right(ends, position)
+
+            if position + len(needle) <= ends[index]:
+                found.append(index)
+
+                # Once is enough, go on from the next line
+                position = ends[index]
+            else:
+                # The match spans two lines
+                position += 1
+
+            position = buffer.find(needle, position)
+
+        return found
+
+    def __len__(self):
+        return len(self._ends)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return self.raw(index).decode()
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
 class DataProvider(object):
 
     def __init__(self):
         self.lines = None
         self.size = None
 
+        # Changes whenever lines already there may change (not on append())
+        self.generation = 0
+
     def update(self, stream):
-        self.lines = []
+        self.clear()
+
+        raw_stream = stream.encode()
+
+        lengths = self.lines.extend(raw_stream)
+
+        if raw_stream.isascii():
+            largest_line = max(lengths)
+        else:
+            largest_line = max(len(line) for line in stream.split('\n'))
+
+        self.size = DataSize(len(lengths), largest_line)
+
+    def clear(self):
+        if self.lines is None:
+            self.lines = LineBuffer()
+        else:
+            self.lines.clear()
+
+        self.size = DataSize(0, 0)
 
-        largest_line = 0
+        self.generation += 1
 
-        for line in stream.split('\n'):
-            self.lines.append(line)
+    def append(self, line):
+        """
+            Appends a line (without the line break) to the data, so it can be
+            fed while a report is still being read.
+        """
+        self.lines.append(line.encode())
 
-            if (len(line) > largest_line):
-                largest_line = len(line)
+        self.size.lines += 1
 
-        self.size = DataSize(len(self.lines), largest_line)
+        if len(line) > self.size.largest_line:
+            self.size.largest_line = len(line)
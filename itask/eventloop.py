@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import heapq
+import itertools
+import os
+import selectors
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from itask.terminal_resize_listener import TerminalResizeListener
+
+
+class FileWatch(object):
+    """
+        Polls the modification time of a set of files.
+    """
+
+    def __init__(self, file_names, callback):
+        self._file_names = list(file_names)
+        self._callback = callback
+        self._stamp = self._current_stamp()
+
+    def _current_stamp(self):
+        stamp = []
+
+        for file_name in self._file_names:
+            try:
+                stamp.append(os.stat(file_name).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+
+        return stamp
+
+    def reset(self):
+        """
+            Takes the current state of the files as the unchanged one (for
+            instance after reloading them).
+        """
+        self._stamp = self._current_stamp()
+
+    def check(self):
+        stamp = self._current_stamp()
+
+        if stamp != self._stamp:
+            self._stamp = stamp
+
+            self._callback()
+
+
+class EventLoop(object):
+    """
+        Waits on stdin (and any other registered file descriptor), terminal
+        resizes, watched files and background jobs, and runs the matching
+        callbacks on the main thread.
+
+        Signal handlers and background threads only wake the loop up through
+        a pipe; all the work is done by run().
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if EventLoop._instance is None:
+            EventLoop._instance = object.__new__(cls)
+            EventLoop._instance._initialized = False
+
+        return EventLoop._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+
+        self._selector = selectors.DefaultSelector()
+
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ,
+                                self._woke_up)
+
+        self._calls = collections.deque()
+        self._calls_lock = threading.Lock()
+
+        self._executor = None
+
+        self._timers = []
+        self._timer_sequence = itertools.count()
+
+        self._watches = []
+        self.watch_interval = 1.0
+        self._next_watch_check = 0
+
+        self._resized = False
+        TerminalResizeListener().register_listener(self._resize_signaled)
+
+        self._running = False
+
+        self._listeners = {'resized': [], 'iteration done': []}
+
+    def register_listener(self, event, listener):
+        self._listeners[event].append(listener)
+
+    def remove_listener(self, event, listener):
+        self._listeners[event].remove(listener)
+
+    def _notify_listeners(self, event, *args, **kwargs):
+        for listener in self._listeners[event]:
+            listener(origin=self, *args, **kwargs)
+
+    def add_reader(self, fd, callback):
+        self._selector.register(fd, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fd):
+        self._selector.unregister(fd)
+
+    def call_soon_threadsafe(self, callback):
+        with self._calls_lock:
+            self._calls.append(callback)
+
+        self._wake_up()
+
+    def call_later(self, delay, callback):
+        """
+            Runs callback from the loop after delay seconds.
+        """
+        deadline = time.monotonic() + delay
+
+        heapq.heappush(self._timers,
+                       (deadline, next(self._timer_sequence), callback))
+
+    def run_in_background(self, function, done_callback):
+        """
+            Runs function on a worker thread. done_callback(future) is then
+            called from the loop, on the main thread.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2)
+
+        future = self._executor.submit(function)
+
+        future.add_done_callback(
+            lambda future: self.call_soon_threadsafe(
+                lambda: done_callback(future)))
+
+        return future
+
+    def watch_files(self, file_names, callback):
+        watch = FileWatch(file_names, callback)
+
+        self._watches.append(watch)
+
+        return watch
+
+    def _wake_up(self):
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except BlockingIOError:
+            # The pipe is full, so the loop is going to wake up anyway
+            pass
+
+    def _resize_signaled(self):
+        # Called from the signal handler: only take note and wake up
+        self._resized = True
+
+        self._wake_up()
+
+    def _woke_up(self):
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _run_calls(self):
+        while True:
+            with self._calls_lock:
+                if not self._calls:
+                    return
+
+                callback = self._calls.popleft()
+
+            callback()
+
+    def _run_timers(self):
+        now = time.monotonic()
+
+        while self._timers and self._timers[0][0] <= now:
+            _, _, callback = heapq.heappop(self._timers)
+
+            callback()
+
+    def _check_watches(self):
+        now = time.monotonic()
+
+        if now < self._next_watch_check:
+            return
+
+        self._next_watch_check = now + self.watch_interval
+
+        for watch in self._watches:
+            watch.check()
+
+    def stop(self):
+        self._running = False
+
+    def run_once(self, timeout=None):
+        """
+            Waits for events (up to timeout seconds, or until the next timer or
+            watched files check) and dispatches them.
+        """
+        deadlines = [timer[0] for timer in self._timers[:1]]
+
+        if self._watches:
+            deadlines.append(self._next_watch_check)
+
+        if deadlines:
+            until_deadline = max(0, min(deadlines) - time.monotonic())
+            timeout = until_deadline if timeout is None \
+                else min(timeout, until_deadline)
+
+        for key, _ in self._selector.select(timeout):
+            key.data()
+
+        if self._resized:
+            self._resized = False
+
+            self._notify_listeners('resized')
+
+        self._run_calls()
+
+        self._run_timers()
+
+        if self._watches:
+            self._check_watches()
+
+        self._notify_listeners('iteration done')
+
+    def run(self):
+        self._running = True
+
+        while self._running:
+            self.run_once()
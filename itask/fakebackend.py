@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import time
+import uuid as uuid_module
+from datetime import datetime, timedelta, timezone
+
+from itask.backend import Backend
+from itask.configsnapshot import ConfigSnapshot
+from itask.taskrecord import TaskRecord
+
+_CONFIG = {
+        'default.command': 'next',
+        'report.next.description': 'Most urgent tasks',
+        'report.next.columns': 'id,entry.age,project,tags,due.relative,' +
+                               'description.count,urgency',
+        'report.next.labels': 'ID,Age,Project,Tags,Due,Description,Urg',
+        'report.next.filter': 'status:pending -WAITING',
+        'report.next.sort': 'urgency-',
+        'report.list.description': 'Pending tasks',
+        'report.list.columns': 'id,project,tags,due,description.count',
+        'report.list.labels': 'ID,Project,Tags,Due,Description',
+        'report.list.filter': 'status:pending',
+        'report.list.sort': 'project+,id+',
+        'report.all.description': 'All tasks',
+        'report.all.columns': 'id,status,uuid.short,project,description',
+        'report.all.labels': 'ID,Status,UUID,Project,Description',
+        'report.all.sort': 'entry-',
+        'report.completed.description': 'Completed tasks',
+        'report.completed.columns': 'uuid.short,end,project,description',
+        'report.completed.labels': 'UUID,Completed,Project,Description',
+        'report.completed.filter': 'status:completed',
+        'report.completed.sort': 'end-',
+        'context.work.read': '+work',
+        'context.work.write': '+work',
+        'context.home.read': '+home',
+        'context.home.write': '+home',
+        }
+
+_WORDS = ['review', 'write', 'fix', 'call', 'plan', 'buy', 'read', 'send',
+          'report', 'budget', 'meeting', 'draft', 'backup', 'invoice',
+          'garden', 'release', 'notes', 'ticket', 'email', 'design']
+_PROJECTS = [None, 'home', 'work', 'work.infra', 'work.docs', 'study']
+_TAGS = ['work', 'home', 'next', 'quick', 'bug', 'waiting']
+
+
+def _format_date(date):
+    return date.strftime('%Y%m%dT%H%M%SZ')
+
+
+class FakeBackend(Backend):
+    """
+        In memory backend with a generated dataset. Each call to export(),
+        reports(), contexts() and to every mutation sleeps latency seconds to
+        simulate a "task" fork.
+
+        Filters are evaluated in process, raising UnsupportedFilter for terms
+        outside of what taskfilter supports.
+    """
+
+    def __init__(self, task_count=1000, latency=0.0, context=None, seed=0):
+        super(FakeBackend, self).__init__(context)
+
+        self._latency = latency
+
+        self._config = ConfigSnapshot(dict(_CONFIG))
+
+        self._tasks = self._generate(task_count, random.Random(seed))
+        self._renumber()
+
+        self._undo_stack = []
+
+    def _generate(self, task_count, rng):
+        now = datetime.now(timezone.utc)
+
+        tasks = []
+
+        for _ in range(task_count):
+            entry = now - timedelta(days=rng.randint(0, 1000))
+
+            attributes = {
+                    'uuid': str(uuid_module.UUID(int=rng.getrandbits(128))),
+                    'description': ' '.join(rng.sample(_WORDS, 3)),
+                    'entry': _format_date(entry),
+                    'modified': _format_date(entry),
+                    'status': rng.choice(['pending'] * 4 + ['completed']),
+                    'urgency': round(rng.uniform(0, 20), 2),
+                    }
+
+            project = rng.choice(_PROJECTS)
+            if project:
+                attributes['project'] = project
+
+            tags = rng.sample(_TAGS, rng.randint(0, 2))
+            if tags:
+                attributes['tags'] = tags
+
+            if rng.random() < 0.3:
+                due = now + timedelta(days=rng.randint(-10, 60))
+                attributes['due'] = _format_date(due)
+
+            if attributes['status'] == 'completed':
+                attributes['end'] = _format_date(now)
+
+            tasks.append(TaskRecord(attributes))
+
+        return tasks
+
+    def _renumber(self):
+        next_id = 1
+
+        for task in self._tasks:
+            if task.status == 'pending':
+                task.id = next_id
+                next_id += 1
+            else:
+                task.id = 0
+
+    def _simulate_call(self):
+        if self._latency:
+            time.sleep(self._latency)
+
+    def config(self):
+        return self._config
+
+    def reports(self):
+        self._simulate_call()
+
+        return super(FakeBackend, self).reports()
+
+    def contexts(self):
+        self._simulate_call()
+
+        return super(FakeBackend, self).contexts()
+
+    def _export(self, report, filters):
+        self._simulate_call()
+
+        return self._evaluate_report(self._tasks, report, filters)
+
+    # Mutations
+    def _tasks_by_ids(self, ids):
+        ids = set(ids)
+
+        return [index for index, task in enumerate(self._tasks)
+                if task.id in ids]
+
+    def _replace(self, indexes, change):
+        undo = []
+
+        for index in indexes:
+            attributes = dict(self._tasks[index].attributes)
+            undo.append((index, self._tasks[index]))
+
+            change(attributes)
+
+            attributes['modified'] = _format_date(datetime.now(timezone.utc))
+            self._tasks[index] = TaskRecord(attributes)
+
+        self._undo_stack.append(undo)
+
+        self._renumber()
+
+        self._notify_listeners('data changed')
+
+    def _apply_modifications(self, attributes, modifications):
+        words = []
+
+        for token in modifications:
+            if token.startswith('+') and len(token) > 1:
+                tags = attributes.setdefault('tags', [])
+
+                if token[1:] not in tags:
+                    tags.append(token[1:])
+            elif token.startswith('-') and len(token) > 1:
+                tags = attributes.get('tags', [])
+
+                if token[1:] in tags:
+                    tags.remove(token[1:])
+            elif token.startswith('project:'):
+                attributes['project'] = token[len('project:'):]
+            elif ':' not in token:
+                words.append(token)
+
+        if words:
+            attributes['description'] = ' '.join(words)
+
+    def add(self, parameters):
+        self._simulate_call()
+
+        now = _format_date(datetime.now(timezone.utc))
+
+        attributes = {'uuid': str(uuid_module.uuid4()), 'status': 'pending',
+                      'entry': now, 'modified': now}
+
+        self._apply_modifications(attributes, parameters)
+
+        self._tasks.append(TaskRecord(attributes))
+
+        self._undo_stack.append([(len(self._tasks) - 1, None)])
+
+        self._renumber()
+
+        self._notify_listeners('data changed')
+
+    def annotate(self, id, annotation):
+        self._simulate_call()
+
+        def change(attributes):
+            annotations = list(attributes.get('annotations', []))
+            annotations.append({
+                'entry': _format_date(datetime.now(timezone.utc)),
+                'description': ' '.join(annotation)})
+            attributes['annotations'] = annotations
+
+        self._replace(self._tasks_by_ids([id]), change)
+
+    def done(self, ids):
+        self._simulate_call()
+
+        def change(attributes):
+            attributes['status'] = 'completed'
+            attributes['end'] = _format_date(datetime.now(timezone.utc))
+
+        self._replace(self._tasks_by_ids(ids), change)
+
+    def view(self, ids):
+        self._simulate_call()
+
+        for index in self._tasks_by_ids(ids):
+            for key, value in sorted(self._tasks[index].attributes.items()):
+                print(f'{key:12} {value}')
+
+            print()
+
+    def mod(self, ids, modifications):
+        self._simulate_call()
+
+        self._replace(self._tasks_by_ids(ids),
+                      lambda attributes: self._apply_modifications(
+                          attributes, modifications))
+
+    def delete(self, ids, comment):
+        self._simulate_call()
+
+        def change(attributes):
+            attributes['status'] = 'deleted'
+            attributes['end'] = _format_date(datetime.now(timezone.utc))
+
+        self._replace(self._tasks_by_ids(ids), change)
+
+    def undo(self):
+        self._simulate_call()
+
+        if not self._undo_stack:
+            return
+
+        for index, task in reversed(self._undo_stack.pop()):
+            if task is None:
+                del self._tasks[index]
+            else:
+                self._tasks[index] = task
+
+        self._renumber()
+
+        self._notify_listeners('data changed')
+
+    def sync(self):
+        self._simulate_call()
+
+        self._notify_listeners('data changed')
+
+    def projects(self):
+        self._simulate_call()
+
+        projects = sorted({task.project for task in self._tasks
+                           if task.project and task.status == 'pending'})
+
+        print('\n'.join(projects))
+
+    def tags(self):
+        self._simulate_call()
+
+        tags = sorted({tag for task in self._tasks
+                       if task.status == 'pending' for tag in task.tags})
+
+        print('\n'.join(tags))
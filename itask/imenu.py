@@ -5,23 +5,46 @@ from itask import configs
 
 import shutil
 import sys
+import time
 
 from itask import console
-import signal
+from itask.eventloop import EventLoop
+from itask.keymap import KEY_SEQUENCES, KeyMap
+
+# Frames per second painted at most, however fast keys arrive
+MAX_FRAME_RATE = 60
+
+# Seconds without a new resize before the menu is laid out for the new size
+RESIZE_DELAY = 0.1
+
+# Seconds to wait for the rest of an escape sequence before taking what was
+# read as a key on its own
+ESCAPE_DELAY = 0.05
 
 
 class MenuItem(object):
 
     def __init__(self, hotkey, title='', action=None, visible=True,
-                 interactive=True):
-        self.hotkey = hotkey
+                 interactive=True, counted=False):
+        """
+            hotkey: A key (see keymap.key_sequences) or a list of them. The
+                first one is shown in the menu.
+            counted: Whether action takes the count typed before the key (as
+                in "25j").
+        """
+        self.hotkeys = hotkey if isinstance(hotkey, list) else [hotkey]
+        self.hotkey = self.hotkeys[0]
         self.title = title
         self.action = action
         self.visible = visible
         self.interactive = interactive
+        self.counted = counted
 
-    def run(self):
+    def run(self, count=1):
         if self.action:
+            if self.counted:
+                return self.action(count)
+
             return self.action()
 
 
@@ -32,8 +55,8 @@ class QuitMenuItem(MenuItem):
         super(QuitMenuItem, self).__init__(title=title, hotkey=hotkey,
                                            action=action)
 
-    def run(self):
-        result = super(QuitMenuItem, self).run()
+    def run(self, count=1):
+        result = super(QuitMenuItem, self).run(count)
 
         return 'quit' if not result else result
 
@@ -44,25 +67,127 @@ class BackMenuItem(MenuItem):
         super(BackMenuItem, self).__init__(title=title, hotkey=hotkey,
                                            action=action)
 
-    def run(self):
-        result = super(BackMenuItem, self).run()
+    def run(self, count=1):
+        result = super(BackMenuItem, self).run(count)
 
         return 'back' if not result else result
 
 
+class Prompt(object):
+    """
+        Line of text typed on the menu title line, while the menu keeps
+        handling events (see Menu.start_prompt()).
+    """
+
+    def __init__(self, label, changed=None, finished=None):
+        """
+            changed: Called with the text whenever it changes, returns a status
+                shown after it.
+            finished: Called with the text on enter, or with None on escape.
+        """
+        self.label = label
+        self.text = ''
+        self.status = ''
+
+        self._changed = changed
+        self._finished = finished
+
+        # Escape sequences (arrows...) are decoded and ignored, so only a
+        # bare escape cancels
+        self._key_map = KeyMap()
+
+        for sequences in KEY_SEQUENCES.values():
+            for sequence in sequences:
+                if len(sequence) > 1 and sequence.startswith('\033'):
+                    self._key_map.bind(sequence, 'ignore')
+
+        self._key_map.bind('<enter>', 'finish')
+        self._key_map.bind('\n', 'finish')
+        self._key_map.bind('<esc>', 'cancel')
+        self._key_map.bind('<backspace>', 'erase')
+
+    def __str__(self):
+        if self.status:
+            return '{}{}  {}'.format(self.label, self.text, self.status)
+
+        return self.label + self.text
+
+    @property
+    def pending(self):
+        """
+            True in the middle of an escape sequence (see flush()).
+        """
+        return self._key_map.pending
+
+    def type(self, char):
+        """
+            Handles char, returning whether the prompt is done.
+        """
+        if self._key_map.pending or self._key_map.binds(char):
+            action = self._key_map.feed(char)
+
+            if self._key_map.pending:
+                return False
+
+            return self._run(action)
+        elif char.isprintable():
+            self.text += char
+
+            self._text_changed()
+
+        return False
+
+    def flush(self):
+        """
+            Ends the pending sequence, as no more input is coming, returning
+            whether the prompt is done.
+        """
+        return self._run(self._key_map.flush())
+
+    def _run(self, action):
+        if action == 'finish':
+            self._finish(self.text)
+
+            return True
+        elif action == 'cancel':
+            self._finish(None)
+
+            return True
+        elif action == 'erase':
+            self.text = self.text[:-1]
+
+            self._text_changed()
+
+        return False
+
+    def _text_changed(self):
+        if self._changed:
+            self.status = self._changed(self.text) or ''
+
+    def _finish(self, text):
+        if self._finished:
+            self._finished(text)
+
+
 class Navigable(object):
 
     # Vertical
-    def activate_next(self):
+    def activate_next(self, count=1):
+        pass
+
+    def activate_previous(self, count=1):
+        pass
+
+    def viewer_down(self, count=1):
         pass
 
-    def activate_previous(self):
+    def viewer_up(self, count=1):
         pass
 
-    def viewer_down(self):
+    def page_down(self, count=1):
         pass
 
-    def viewer_up(self):
+    def page_up(self, count=1):
         pass
 
     def activate_first(self):
@@ -72,10 +197,10 @@ class Navigable(object):
         pass
 
     # Horizontal
-    def viewer_left(self):
+    def viewer_left(self, count=1):
         pass
 
-    def viewer_right(self):
+    def viewer_right(self, count=1):
         pass
 
     def viewer_begin(self):
@@ -88,6 +213,25 @@ class Navigable(object):
     def toggle_selected(self):
         pass
 
+    def toggle_range_selected(self):
+        pass
+
+    # Search
+    def search(self):
+        pass
+
+    def search_next(self, count=1):
+        pass
+
+    def search_previous(self, count=1):
+        pass
+
+    def invert_selection(self):
+        pass
+
+    def select_all(self):
+        pass
+
 
 class Menu(object):
 
@@ -112,7 +256,14 @@ class Menu(object):
                 'terminal resized': []
                 }
 
-        signal.signal(signal.SIGWINCH, self._terminal_resized)
+        self._result = None
+        self._render_pending = False
+        self._clear_pending = False
+        self._last_frame = 0
+        self._frame_timer_set = False
+        self._terminal_size = None
+        self._resizes = 0
+        self._prompt = None
 
     def register_listener(self, event, listener):
         self._listeners[event].append(listener)
@@ -137,25 +288,43 @@ class Menu(object):
                     configs.get('navigation.move.next'),
                     action=navigable.activate_next,
                     visible=False,
-                    interactive=False))
+                    interactive=False,
+                    counted=True))
         self.items.append(
                 MenuItem(
                     configs.get('navigation.move.previous'),
                     action=navigable.activate_previous,
                     visible=False,
-                    interactive=False))
+                    interactive=False,
+                    counted=True))
         self.items.append(
                 MenuItem(
                     configs.get('navigation.scroll.down'),
                     action=navigable.viewer_down,
                     visible=False,
-                    interactive=False))
+                    interactive=False,
+                    counted=True))
         self.items.append(
                 MenuItem(
                     configs.get('navigation.scroll.up'),
                     action=navigable.viewer_up,
                     visible=False,
-                    interactive=False))
+                    interactive=False,
+                    counted=True))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.page.down'),
+                    action=navigable.page_down,
+                    visible=False,
+                    interactive=False,
+                    counted=True))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.page.up'),
+                    action=navigable.page_up,
+                    visible=False,
+                    interactive=False,
+                    counted=True))
         self.items.append(
                 MenuItem(
                     configs.get('navigation.move.first'),
@@ -175,13 +344,15 @@ class Menu(object):
                     configs.get('navigation.scroll.left'),
                     action=navigable.viewer_left,
                     visible=False,
-                    interactive=False))
+                    interactive=False,
+                    counted=True))
         self.items.append(
                 MenuItem(
                     configs.get('navigation.scroll.right'),
                     action=navigable.viewer_right,
                     visible=False,
-                    interactive=False))
+                    interactive=False,
+                    counted=True))
         self.items.append(
                 MenuItem(
                     configs.get('navigation.scroll.begin'),
@@ -202,6 +373,46 @@ class Menu(object):
                     action=navigable.toggle_selected,
                     visible=False,
                     interactive=False))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.toggle_range_selected'),
+                    action=navigable.toggle_range_selected,
+                    visible=False,
+                    interactive=False))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.invert_selection'),
+                    action=navigable.invert_selection,
+                    visible=False,
+                    interactive=False))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.select_all'),
+                    action=navigable.select_all,
+                    visible=False,
+                    interactive=False))
+
+        # Search
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.search.start'),
+                    action=navigable.search,
+                    visible=False,
+                    interactive=False))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.search.next'),
+                    action=navigable.search_next,
+                    visible=False,
+                    interactive=False,
+                    counted=True))
+        self.items.append(
+                MenuItem(
+                    configs.get('navigation.search.previous'),
+                    action=navigable.search_previous,
+                    visible=False,
+                    interactive=False,
+                    counted=True))
 
     def _initialize(self):
         visible_items = []
@@ -214,55 +425,251 @@ class Menu(object):
 
         self._itens_string = ''.join(visible_items)[2:]
 
+        self._key_map = KeyMap()
+
+        # Reversed, so the first item bound to a key wins
+        for item in reversed(self.items):
+            for hotkey in item.hotkeys:
+                self._key_map.bind(hotkey, item)
+
+        self._count = ''
+        self._keys_read = 0
+
     def run(self):
+        session = console.TerminalSession()
+
+        session.enter()
+
+        try:
+            self._run()
+        finally:
+            session.leave()
+
+    def _run(self):
         console.clear_screen()
 
         self._initialize()
 
-        key = None
-        result = None
+        self._result = None
+
+        self._terminal_size = shutil.get_terminal_size()
+
+        loop = EventLoop()
+
+        loop.add_reader(sys.stdin.fileno(), self._key_available)
+        loop.register_listener('resized', self._terminal_resized)
+        loop.register_listener('iteration done', self._iteration_done)
+
+        try:
+            self._render_frame()
+
+            loop.run()
+        finally:
+            loop.remove_listener('iteration done', self._iteration_done)
+            loop.remove_listener('resized', self._terminal_resized)
+            loop.remove_reader(sys.stdin.fileno())
+
+    def invalidate(self):
+        """
+            Asks for a new frame, painted once the events being handled by the
+            loop are done.
+        """
+        self._render_pending = True
+
+    def clear(self):
+        """
+            Asks for the screen to be cleared before the next frame, for
+            changes which leave parts of it unpainted.
+        """
+        self._clear_pending = True
+
+        self.invalidate()
+
+    def _render_frame(self):
+        self._render_pending = False
+
+        console.begin_frame()
+
+        if self._clear_pending:
+            self._clear_pending = False
+
+            console.clear_screen()
+
+        self._notify_listeners('render')
+
+        self.render()
+
+        console.end_frame()
+
+        self._last_frame = time.monotonic()
+
+    def _iteration_done(self, origin):
+        if not self._render_pending or self._result in ('quit', 'back'):
+            return
+
+        wait = self._last_frame + 1 / MAX_FRAME_RATE - time.monotonic()
 
-        while result not in ('quit', 'back'):
-            self._notify_listeners('render')
+        if wait <= 0:
+            self._render_frame()
+        elif not self._frame_timer_set:
+            self._frame_timer_set = True
 
-            self.render()
+            EventLoop().call_later(wait, self._frame_timer_expired)
 
-            key = console.getch()
+    def _frame_timer_expired(self):
+        # The frame itself is painted by _iteration_done()
+        self._frame_timer_set = False
 
-            item_found = False
-            for item in self.items:
-                if item.hotkey == key:
-                    self._notify_listeners('item chosen', item=item)
-                    result = item.run()
+    def _key_available(self):
+        # Everything typed ahead (a held key, a pasted count...) is handled
+        # before painting, so it costs a single frame
+        while True:
+            char = console.getch()
 
-                    item_found = True
+            if not char:
+                # End of input
+                self._result = 'quit'
+                break
 
-                    break
+            self._keys_read += 1
 
-            item = item if item_found else None
-            self._notify_listeners('after action', item=item)
+            item = self._handle_char(char)
+
+            if self._result in ('quit', 'back') or \
+                    (item and item.interactive) or \
+                    not console.input_pending():
+                break
+
+        if self._result in ('quit', 'back'):
+            EventLoop().stop()
+        elif self._key_map.pending or (self._prompt and self._prompt.pending):
+            keys_read = self._keys_read
+
+            EventLoop().call_later(ESCAPE_DELAY,
+                                   lambda: self._escape_delay_expired(
+                                       keys_read))
+
+        self.invalidate()
+
+    def _escape_delay_expired(self, keys_read):
+        if keys_read != self._keys_read:
+            # More input came in the meantime
+            return
+
+        if self._prompt and self._prompt.pending:
+            if self._prompt.flush():
+                self._prompt = None
+
+            self.invalidate()
+
+            return
+
+        if not self._key_map.pending:
+            return
+
+        item = self._key_map.flush()
+
+        self._handle_item(item)
+
+        if self._result in ('quit', 'back'):
+            EventLoop().stop()
+
+        self.invalidate()
+
+    def start_prompt(self, prompt):
+        """
+            Sends the keys typed from now on to prompt, until it is done.
+        """
+        self._prompt = prompt
+        self._count = ''
+
+        self.invalidate()
+
+    def _handle_char(self, char):
+        """
+            Feeds char into the prompt, the count or the key map, running the
+            item bound to the sequence it ends (returned).
+        """
+        if self._prompt:
+            if self._prompt.type(char):
+                self._prompt = None
+
+            return None
+
+        # As in vi, a count can't start with 0
+        if not self._key_map.pending and char.isdigit() and \
+                (self._count or
+                 (char != '0' and not self._key_map.binds(char))):
+            self._count += char
+
+            return None
+
+        item = self._key_map.feed(char)
+
+        if self._key_map.pending:
+            return None
+
+        self._handle_item(item)
+
+        return item
+
+    def _handle_item(self, item):
+        count = int(self._count) if self._count else 1
+        self._count = ''
+
+        if item:
+            self._notify_listeners('item chosen', item=item)
+            self._result = self._run_item(item, count)
+
+        self._notify_listeners('after action', item=item)
+
+    def _run_item(self, item, count=1):
+        if not item.interactive:
+            return item.run(count)
+
+        with console.TerminalSession().suspended():
+            return item.run(count)
 
     def render(self):
         terminal_size = shutil.get_terminal_size()
 
         console.move_cursor(1, terminal_size.lines - 1)
-        title_string = '[{}]'.format(self.title)[:terminal_size.columns - 1]
-        sys.stdout.write(title_string)
-
-        sys.stdout.flush()
+        if self._prompt:
+            title_string = str(self._prompt).ljust(terminal_size.columns - 1)
+        else:
+            title_string = '[{}]'.format(self.title).ljust(
+                    terminal_size.columns - 1)
+        console.write_text(title_string[:terminal_size.columns - 1])
 
         console.move_cursor(1, terminal_size.lines)
         last_column = terminal_size.columns - 1
         itens_string = '{}'.format(self._itens_string)[:last_column]
-        sys.stdout.write(itens_string)
+        console.write_text(itens_string)
+
+    def _terminal_resized(self, origin):
+        # Resizes come in bursts (while a window border is dragged), only the
+        # last one is laid out
+        self._resizes += 1
+
+        resizes = self._resizes
 
-        sys.stdout.flush()
+        EventLoop().call_later(RESIZE_DELAY,
+                               lambda: self._resize_settled(resizes))
 
-    def _terminal_resized(self, signal_number, stack):
-        if hasattr(stack, '__len__'):
-            stack[len(stack)].f_back()
+    def _resize_settled(self, resizes):
+        if resizes != self._resizes:
+            return
 
         size = shutil.get_terminal_size()
 
+        if size == self._terminal_size:
+            return
+
+        self._terminal_size = size
+
         self._notify_listeners('terminal resized', columns=size.columns,
                                lines=size.lines)
+
+        self._clear_pending = True
+
+        self.invalidate()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Input sent by the terminal for the keys which can be named as "<name>" in
+# the key configuration (both the normal and the application cursor mode)
+KEY_SEQUENCES = {
+        'up': ['\033[A', '\033OA'],
+        'down': ['\033[B', '\033OB'],
+        'right': ['\033[C', '\033OC'],
+        'left': ['\033[D', '\033OD'],
+        'home': ['\033[H', '\033OH', '\033[1~', '\033[7~'],
+        'end': ['\033[F', '\033OF', '\033[4~', '\033[8~'],
+        'pageup': ['\033[5~'],
+        'pagedown': ['\033[6~'],
+        'insert': ['\033[2~'],
+        'delete': ['\033[3~'],
+        'esc': ['\033'],
+        'enter': ['\r'],
+        'tab': ['\t'],
+        'space': [' '],
+        'backspace': ['\x7f', '\b'],
+        }
+
+
+def key_sequences(key):
+    """
+        Returns the input strings for key: a single character or a key name
+        between angle brackets (see KEY_SEQUENCES).
+    """
+    if len(key) > 2 and key.startswith('<') and key.endswith('>'):
+        try:
+            return KEY_SEQUENCES[key[1:-1].lower()]
+        except KeyError:
+            raise ValueError('Unknown key: {}'.format(key))
+
+    return [key]
+
+
+class _Node(object):
+
+    __slots__ = ('item', 'children')
+
+    def __init__(self):
+        self.item = None
+        self.children = dict()
+
+
+class KeyMap(object):
+    """
+        Trie of the key sequences bound to menu items. Input is fed one
+        character at a time, each one costing a dictionary lookup.
+
+        A sequence which is also the prefix of a longer one (like escape)
+        stays pending until flush() tells no more input is coming.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._node = self._root
+
+    def bind(self, key, item):
+        for sequence in key_sequences(key):
+            node = self._root
+
+            for char in sequence:
+                node = node.children.setdefault(char, _Node())
+
+            node.item = item
+
+    def binds(self, char):
+        """
+            Tells whether char starts a bound sequence.
+        """
+        return char in self._root.children
+
+    @property
+    def pending(self):
+        """
+            True in the middle of a sequence.
+        """
+        return self._node is not self._root
+
+    def feed(self, char):
+        """
+            Returns the item bound to the sequence ended by char, or None when
+            the sequence isn't complete yet (see pending) or isn't bound.
+        """
+        node = self._node.children.get(char)
+
+        if node is None:
+            if self.pending:
+                # Unknown sequence, drop what was typed before char
+                self._node = self._root
+
+                return self.feed(char)
+
+            return None
+
+        if node.children:
+            self._node = node
+
+            return None
+
+        self._node = self._root
+
+        return node.item
+
+    def flush(self):
+        """
+            Ends the pending sequence, returning the item bound to it (if
+            any).
+        """
+        node, self._node = self._node, self._root
+
+        return node.item
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from itask.viewer import Viewer, Region
+
+
+class Layout(object):
+    """
+        Splits the screen in panes, each one a Viewer showing a Region of a
+        data provider:
+
+            +--------+----------------+---------+
+            | corner | header         |         |
+            +--------+----------------+  right  |
+            | left   | data           |  panes  |
+            |        |                |         |
+            +--------+----------------+---------+
+            | bottom panes                      |
+            +-----------------------------------+
+            | reserved lines (the menu)         |
+
+        The frozen rows (corner and header) only scroll horizontally, along
+        with the data pane; the frozen columns (corner and left) only
+        vertically. Extra panes are docked on the right or at the bottom and
+        don't scroll with the data.
+
+        Viewers are created once and then reused: arrange() only resizes and
+        moves them, so the selection and the scroll position are kept.
+    """
+
+    def __init__(self, data_provider, selection, first_line=0,
+                 reserved_lines=0):
+        """
+            first_line: Line of data_provider shown on the first frozen row.
+            reserved_lines: Lines at the bottom of the screen left out of the
+                layout.
+        """
+        self._data_provider = data_provider
+        self._selection = selection
+
+        self._first_line = first_line
+        self._reserved_lines = reserved_lines
+
+        self.frozen_rows = 0
+        self.frozen_columns = 0
+
+        # Lines at the end of the data which aren't part of the scrolling
+        # area (like the tasks count of a report)
+        self.trailing_lines = 0
+
+        self._viewers = {
+                'corner': self._make_viewer(data_provider),
+                'header': self._make_viewer(data_provider),
+                'left': self._make_viewer(data_provider, selection),
+                'data': self._make_viewer(data_provider, selection)}
+
+        # Docked panes, name: (side, size)
+        self._docked = dict()
+
+    def _make_viewer(self, data_provider, selection=None):
+        region = Region(size={'width': 0, 'height': 0})
+
+        return Viewer(data_provider, region, selection)
+
+    def add_pane(self, name, data_provider, side='right', size=40):
+        """
+            Docks a new pane (detail, preview...) on a side of the data panes.
+
+            side: "right" or "bottom".
+            size: Columns (right) or lines (bottom) taken by the pane.
+        """
+        if side not in ('right', 'bottom'):
+            raise ValueError('Invalid side: {}'.format(side))
+
+        self._viewers[name] = self._make_viewer(data_provider)
+        self._docked[name] = (side, size)
+
+        return self._viewers[name]
+
+    def remove_pane(self, name):
+        del self._docked[name]
+        del self._viewers[name]
+
+    def viewer(self, name):
+        return self._viewers[name]
+
+    @property
+    def viewers(self):
+        return list(self._viewers.values())
+
+    def freeze(self, rows=None, columns=None):
+        if rows is not None:
+            self.frozen_rows = rows
+
+        if columns is not None:
+            self.frozen_columns = columns
+
+    def arrange(self, columns, lines):
+        """
+            Computes the geometry of every pane for a columns x lines screen,
+            and the data pane constraints for the current data.
+        """
+        # The last column is left alone, writing there wraps the line
+        width = columns - 1
+        height = lines - self._reserved_lines
+
+        for name, (side, size) in self._docked.items():
+            viewer = self._viewers[name]
+
+            if side == 'right':
+                size = min(size, width)
+                width -= size
+
+                self._place(viewer, 0, width, size, height)
+            else:
+                size = min(size, height)
+                height -= size
+
+                self._place(viewer, height, 0, width, size)
+
+        data_size = self._data_provider.size
+
+        frozen_columns = min(self.frozen_columns, width)
+        frozen_rows = min(self.frozen_rows, height)
+
+        data_top = self._first_line + frozen_rows
+
+        # Frozen panes are pinned by constraints which leave no room to move
+        frozen_horizontal_constraints = {'left': 0, 'right': frozen_columns}
+        frozen_vertical_constraints = {
+                'top': self._first_line,
+                'bottom': data_top}
+
+        horizontal_constraints = {
+                'left': frozen_columns,
+                'right': data_size.largest_line}
+        vertical_constraints = {
+                'top': data_top,
+                'bottom': data_size.lines - self.trailing_lines}
+
+        self._selection.set_constraints(vertical_constraints)
+
+        self._place(self._viewers['corner'], 0, 0, frozen_columns,
+                    frozen_rows, frozen_horizontal_constraints,
+                    frozen_vertical_constraints)
+        self._place(self._viewers['header'], 0, frozen_columns,
+                    width - frozen_columns, frozen_rows,
+                    horizontal_constraints, frozen_vertical_constraints)
+        self._place(self._viewers['left'], frozen_rows, 0, frozen_columns,
+                    height - frozen_rows, frozen_horizontal_constraints,
+                    vertical_constraints)
+        self._place(self._viewers['data'], frozen_rows, frozen_columns,
+                    width - frozen_columns, height - frozen_rows,
+                    horizontal_constraints, vertical_constraints)
+
+        # Shrinking may leave the active line below the data pane
+        hidden_lines = self._selection.active_line - \
+            self._viewers['data'].region.bottom
+
+        self.scroll('down', max(hidden_lines, 0))
+
+    def _place(self, viewer, screen_top, screen_left, width, height,
+               horizontal_constraints=None, vertical_constraints=None):
+        if horizontal_constraints is None:
+            horizontal_constraints = {'left': 0, 'right': 'width'}
+
+        if vertical_constraints is None:
+            vertical_constraints = {'top': 0, 'bottom': 'height'}
+
+        viewer.region.resize(width=max(width, 0), height=max(height, 0))
+        viewer.region.set_constraints(horizontal_constraints,
+                                      vertical_constraints)
+
+        viewer.place(screen_left, screen_top)
+
+        viewer.invalidate()
+
+    def scroll(self, direction, cells=1):
+        """
+            Moves the data pane, and the frozen panes along with it.
+        """
+        data_region = self._viewers['data'].region
+
+        data_region.move(direction, cells)
+
+        # Moving the data region may have moved the selection, and the left
+        # region along with it, so they are synchronized afterwards
+        self._viewers['left'].region.move('set top', data_region.top)
+        self._viewers['header'].region.move('set left', data_region.left)
+
+    def rewind(self):
+        """
+            Scrolls back to the beginning of the data.
+        """
+        self.scroll('top')
+        self.scroll('begin')
+
+        self._selection.move('first')
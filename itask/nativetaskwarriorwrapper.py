@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from itask.reportformatter import ReportFormatter
+from itask.taskfilter import UnsupportedFilter
+from itask.taskrecord import TaskRecord
+from itask.taskwarriordatareader import TaskwarriorDataReader
+from itask.taskwarriorwrapper import TaskwarriorWrapper
+
+_ID_STATUSES = ('pending', 'waiting', 'recurring')
+
+_URGENCY_DEFAULTS = {
+        'next': 15.0, 'due': 12.0, 'blocking': 8.0, 'uda.priority.H': 6.0,
+        'uda.priority.M': 3.9, 'uda.priority.L': 1.8, 'scheduled': 5.0,
+        'active': 4.0, 'age': 2.0, 'annotations': 1.0, 'tags': 1.0,
+        'project': 1.0, 'waiting': -3.0, 'blocked': -5.0}
+
+# Seconds the TaskRecords are reused for while the data files don't change
+# (urgency changes with time)
+_TASKS_LIFETIME = 60
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class NativeTaskwarriorWrapper(TaskwarriorWrapper):
+    """
+        Reads tasks straight from pending.data and completed.data instead of
+        running "task". Reports whose filter can't be evaluated here, and
+        every mutation, still go through the task binary.
+    """
+
+    def __init__(self, task_data=None, context=None, binary=None):
+        super(NativeTaskwarriorWrapper, self).__init__(task_data, context,
+                                                       binary)
+
+        data_location = self.data_location()
+
+        self._pending_reader = TaskwarriorDataReader(
+                os.path.join(data_location, 'pending.data'))
+        self._completed_reader = TaskwarriorDataReader(
+                os.path.join(data_location, 'completed.data'))
+
+        # Entries the TaskRecords were made from, and when
+        self._tasks = None
+        self._tasks_source = None
+
+        # The readers and the TaskRecords are shared by the threads loading
+        # reports
+        self._tasks_lock = threading.Lock()
+
+    def tasks(self):
+        """
+            Returns all tasks as TaskRecords, with IDs assigned the same way
+            Taskwarrior does (file order in pending.data).
+
+            The same list is returned while the data files don't change, so
+            filtering it again reuses its TaskIndex.
+        """
+        with self._tasks_lock:
+            pending = self._pending_reader.read()
+            completed = self._completed_reader.read()
+
+            period = int(time.monotonic() // _TASKS_LIFETIME)
+
+            if self._tasks_source is not None:
+                source_pending, source_completed, source_sizes, \
+                    source_period = self._tasks_source
+
+                # The readers append to their lists, or make new ones
+                if source_pending is pending and \
+                        source_completed is completed and \
+                        source_sizes == (len(pending), len(completed)) and \
+                        source_period == period:
+                    return self._tasks
+
+            self._tasks = self._make_tasks(pending, completed)
+            self._tasks_source = (pending, completed,
+                                  (len(pending), len(completed)), period)
+
+            return self._tasks
+
+    def _make_tasks(self, pending, completed):
+        coefficients = self._urgency_coefficients()
+
+        tasks = []
+        next_id = 1
+
+        for entry in pending:
+            if entry.get('status') in _ID_STATUSES:
+                entry = dict(entry, id=next_id)
+                next_id += 1
+
+            tasks.append(TaskRecord(entry))
+
+        for entry in completed:
+            tasks.append(TaskRecord(entry))
+
+        # Dependencies only count while the depended on task is pending
+        pending_uuids = {task.uuid for task in tasks
+                         if task.status in ('pending', 'waiting')}
+        blocking = {uuid for task in tasks
+                    if task.uuid in pending_uuids
+                    for uuid in task.depends if uuid in pending_uuids}
+
+        for task in tasks:
+            blocked = any(uuid in pending_uuids for uuid in task.depends)
+
+            task.urgency = self._urgency(task, coefficients,
+                                         task.uuid in blocking, blocked)
+
+        return tasks
+
+    def _urgency_coefficients(self):
+        coefficients = dict(_URGENCY_DEFAULTS)
+
+        for key, value in self.config().prefixed('urgency.').items():
+            if key.endswith('.coefficient'):
+                try:
+                    coefficients[key[:-len('.coefficient')]] = float(value)
+                except ValueError:
+                    pass
+
+        return coefficients
+
+    def _urgency(self, task, coefficients, blocking, blocked):
+        """
+            Urgency computed with the Taskwarrior terms and coefficients
+            (urgency.inherit aside).
+
+            blocking: Whether a pending task depends on this one.
+            blocked: Whether this task depends on a pending task.
+        """
+        if task.status not in ('pending', 'waiting'):
+            return 0.0
+
+        now = _now()
+
+        def count_factor(count):
+            return {0: 0.0, 1: 0.8, 2: 0.9}.get(count, 1.0)
+
+        urgency = 0.0
+
+        if 'next' in task.tags:
+            urgency += coefficients['next']
+
+        if task.due:
+            days_overdue = (now - task.due).total_seconds() / 86400
+
+            if days_overdue >= 7:
+                due = 1.0
+            elif days_overdue >= -14:
+                due = ((days_overdue + 14) * 0.8 / 21) + 0.2
+            else:
+                due = 0.2
+
+            urgency += due * coefficients['due']
+
+        if blocking:
+            urgency += coefficients['blocking']
+
+        if blocked:
+            urgency += coefficients['blocked']
+
+        if task.scheduled and task.scheduled < now:
+            urgency += coefficients['scheduled']
+
+        if task.start:
+            urgency += coefficients['active']
+
+        if task.entry:
+            age = (now - task.entry).total_seconds() / 86400
+            urgency += min(age / 365, 1.0) * coefficients['age']
+
+        urgency += count_factor(len(task.annotations)) * \
+            coefficients['annotations']
+        urgency += count_factor(len(task.tags)) * coefficients['tags']
+
+        if task.project:
+            urgency += coefficients['project']
+
+        if task.status == 'waiting':
+            urgency += coefficients['waiting']
+
+        for name, coefficient in coefficients.items():
+            urgency += self._user_urgency(task, name) * coefficient
+
+        return urgency
+
+    def _user_urgency(self, task, name):
+        """
+            Factor of the user defined coefficients (uda.<name>,
+            uda.<name>.<value>, user.tag.<tag>, user.project.<project> and
+            user.keyword.<keyword>), 0 for the other ones.
+        """
+        kind, _, rest = name.partition('.')
+
+        if kind == 'uda':
+            attribute, dot, value = rest.partition('.')
+            actual = task.attributes.get(attribute, '')
+
+            if dot:
+                return 1.0 if actual == value else 0.0
+            else:
+                return 1.0 if actual != '' else 0.0
+
+        if kind != 'user':
+            return 0.0
+
+        kind, _, value = rest.partition('.')
+
+        if kind == 'tag':
+            return 1.0 if value in task.tags else 0.0
+        elif kind == 'project':
+            return 1.0 if (task.project or '').startswith(value) else 0.0
+        elif kind == 'keyword':
+            return 1.0 if value in task.description else 0.0
+
+        return 0.0
+
+    def _export(self, report, filters):
+        try:
+            return self._evaluate_report(self.tasks(), report, filters)
+        except UnsupportedFilter:
+            return super(NativeTaskwarriorWrapper, self)._export(report,
+                                                                 filters)
+
+    def _load(self, report, filters):
+        try:
+            tasks = self._evaluate_report(self.tasks(), report, filters)
+        except UnsupportedFilter:
+            return super(NativeTaskwarriorWrapper, self)._load(report, filters)
+
+        return ReportFormatter(*self.report_columns(report)).format(tasks)
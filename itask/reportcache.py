@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+from collections import OrderedDict
+
+# Default memory bound of a ReportCache, in bytes
+DEFAULT_SIZE = 64 * 1024 * 1024
+
+# Default seconds a ReportCache entry is used for (reports have relative
+# dates, ages and urgencies, which change with time)
+DEFAULT_MAX_AGE = 60
+
+# Estimated memory taken by each TaskRecord (attributes dictionary, parsed
+# dates, tags...)
+TASK_RECORD_SIZE = 2048
+
+
+def report_size(tasks, stream):
+    """
+        Estimates the memory taken by a loaded report: the report text and
+        the exported tasks (None in report mode).
+    """
+    size = sys.getsizeof(stream)
+
+    if tasks is not None:
+        size += sys.getsizeof(tasks) + len(tasks) * TASK_RECORD_SIZE
+
+    return size
+
+
+class ReportCache(object):
+    """
+        Loaded reports, the least recently used ones being dropped when their
+        estimated size goes over max_size bytes, and each one when it is older
+        than max_age seconds.
+
+        Keys must tell every input of the report (report, context, filters
+        and the version of the data): besides their age, entries are never
+        invalidated one by one, only all of them with clear().
+    """
+
+    def __init__(self, max_size=DEFAULT_SIZE, max_age=DEFAULT_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+
+        # key: (value, size, time stored), from the least to the most
+        # recently used
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key):
+        """
+            Returns the value stored for key, or None.
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry[2] > self.max_age:
+            self._remove(key)
+
+            return None
+
+        self._entries.move_to_end(key)
+
+        return entry[0]
+
+    def put(self, key, value, size):
+        """
+            Stores value, which takes size bytes (values larger than the
+            cache aren't stored).
+        """
+        self._remove(key)
+
+        if size > self.max_size:
+            return
+
+        while self._entries and self._size + size > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+        self._entries[key] = (value, size, time.monotonic())
+        self._size += size
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self._size -= entry[1]
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
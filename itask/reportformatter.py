@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timezone
+
+DEFAULT_COLUMNS = ['id', 'project', 'tags', 'due.relative', 'description',
+                   'urgency']
+
+# Columns always shown, even when every cell is empty
+_MANDATORY_COLUMNS = ('id', 'description')
+
+_DURATION_UNITS = [(365 * 86400, 'y'), (30 * 86400, 'mo'), (7 * 86400, 'w'),
+                   (86400, 'd'), (3600, 'h'), (60, 'min'), (1, 's')]
+
+
+def _format_duration(seconds):
+    negative = seconds < 0
+    seconds = abs(int(seconds))
+
+    for unit_seconds, unit in _DURATION_UNITS:
+        if seconds >= unit_seconds:
+            text = f'{seconds // unit_seconds}{unit}'
+            break
+    else:
+        text = '0s'
+
+    return f'-{text}' if negative else text
+
+
+class ReportFormatter(object):
+    """
+        Renders task records in the same layout Taskwarrior uses for text
+        reports: a blank line, a header line, a dash line, one line per task,
+        a blank line and the task count. Each task is always a single line, so
+        line N of the data area maps to task N.
+    """
+
+    def __init__(self, columns=None, labels=None):
+        self.columns = columns or DEFAULT_COLUMNS
+        self.labels = labels or [column.split('.')[0].capitalize()
+                                 for column in self.columns]
+
+        if len(self.labels) < len(self.columns):
+            self.labels += [column.split('.')[0].capitalize()
+                            for column in self.columns[len(self.labels):]]
+
+        self._id_column_width = 0
+
+    def idColumnWidth(self):
+        return self._id_column_width
+
+    def _format_cell(self, task, column, now):
+        attribute, _, style = column.partition('.')
+
+        value = task.get(attribute)
+
+        if value is None or value == []:
+            return ''
+
+        if attribute == 'description':
+            if style == 'count' and task.annotations:
+                return f'{value} [{len(task.annotations)}]'
+
+            return value
+
+        if attribute == 'uuid' and style == 'short':
+            return value[:8]
+
+        if style == 'indicator':
+            return '*'
+
+        if isinstance(value, datetime):
+            if style == 'age':
+                return _format_duration((now - value).total_seconds())
+            elif style in ('relative', 'remaining', 'countdown'):
+                return _format_duration((value - now).total_seconds())
+            else:
+                return value.astimezone().strftime('%Y-%m-%d')
+
+        if isinstance(value, list):
+            if style == 'count':
+                return f'[{len(value)}]'
+
+            return ' '.join(str(v) for v in value)
+
+        if isinstance(value, float):
+            return f'{value:.3g}'
+
+        return str(value)
+
+    def format(self, tasks):
+        if not tasks:
+            self._id_column_width = 0
+
+            return 'No matches.\n'
+
+        now = datetime.now(timezone.utc)
+
+        rows = [[self._format_cell(task, column, now)
+                 for column in self.columns] for task in tasks]
+
+        visible = [index for index, column in enumerate(self.columns)
+                   if column.split('.')[0] in _MANDATORY_COLUMNS
+                   or any(row[index] for row in rows)]
+
+        widths = {index: max([len(self.labels[index])] +
+                             [len(row[index]) for row in rows])
+                  for index in visible}
+
+        right_aligned = {index for index in visible
+                         if self.columns[index].split('.')[0] in ('id',
+                                                                  'urgency')}
+
+        def join(cells, right_aligned=right_aligned):
+            aligned = [cells[index].rjust(widths[index])
+                       if index in right_aligned
+                       else cells[index].ljust(widths[index])
+                       for index in visible]
+
+            return ' '.join(aligned).rstrip()
+
+        lines = ['']
+        # Labels are left aligned, as Taskwarrior does (and as
+        # TaskwarriorReportParser expects the one of the ID column)
+        lines.append(join({index: self.labels[index] for index in visible},
+                          right_aligned=()))
+        lines.append(join({index: '-' * widths[index] for index in visible}))
+        lines += [join(row) for row in rows]
+        lines.append('')
+        lines.append(f'{len(tasks)} task' + ('s' if len(tasks) > 1 else ''))
+
+        if self.columns[visible[0]] == 'id':
+            self._id_column_width = widths[visible[0]] + 1
+        else:
+            self._id_column_width = 0
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class Search(object):
+    """
+        Incremental search over the lines of a DataProvider. Case is ignored
+        unless the query has upper case letters.
+
+        The matching lines are kept as a sorted array of line indexes: a
+        query which only grows is matched against the previous matches only,
+        and going back (backspace) reuses the matches of the shorter query.
+    """
+
+    def __init__(self, data_provider, searchable=None):
+        """
+            searchable: Function returning the range (with step 1) of lines to
+                search (every line by default).
+        """
+        self._data_provider = data_provider
+        self._searchable = searchable
+
+        self._lowered = None
+        self._lowered_key = None
+
+        self.clear()
+
+    def clear(self):
+        self.query = ''
+        self.matches = array('I')
+
+        # (query, matches) of the shorter queries typed before this one
+        self._history = []
+
+    @property
+    def active(self):
+        return self.query != ''
+
+    def _ignore_case(self, query):
+        return query == query.lower()
+
+    def _lines(self, ignore_case):
+        lines = self._data_provider.lines
+
+        if not ignore_case:
+            return lines
+
+        # The lowered copy is made once for each version of the data
+        key = (self._data_provider.generation, len(lines))
+
+        if self._lowered_key != key:
+            self._lowered = lines.lower()
+            self._lowered_key = key
+
+        return self._lowered
+
+    def update(self, query):
+        """
+            Changes the query, returning the matching lines.
+        """
+        if query == self.query:
+            return self.matches
+
+        while self._history and not query.startswith(self.query):
+            self.query, self.matches = self._history.pop()
+
+        if query == self.query:
+            return self.matches
+
+        if not query:
+            self.clear()
+
+            return self.matches
+
+        ignore_case = self._ignore_case(query)
+
+        lines = self._lines(ignore_case)
+        needle = (query.lower() if ignore_case else query).encode()
+
+        if self.query and self._ignore_case(self.query) == ignore_case:
+            # Only the lines matching the shorter query can match this one
+            found = lines.find(needle, self.matches)
+        else:
+            found = lines.find(needle)
+
+            if self._searchable:
+                searchable = self._searchable()
+                found = found[bisect_left(found, searchable.start):
+                              bisect_left(found, searchable.stop)]
+
+        self._history.append((self.query, self.matches))
+
+        self.query = query
+        self.matches = array('I', found)
+
+        return self.matches
+
+    def is_match(self, line):
+        index = bisect_left(self.matches, line)
+
+        return index < len(self.matches) and self.matches[index] == line
+
+    def next(self, line):
+        """
+            Returns the first match after line (wrapping around), or None.
+        """
+        if not self.matches:
+            return None
+
+        index = bisect_right(self.matches, line)
+
+        return self.matches[index % len(self.matches)]
+
+    def previous(self, line):
+        """
+            Returns the last match before line (wrapping around), or None.
+        """
+        if not self.matches:
+            return None
+
+        index = bisect_left(self.matches, line) - 1
+
+        return self.matches[index % len(self.matches)]
+
+    def spans(self, text):
+        """
+            Returns the (start, end) of each occurrence of the query in text.
+        """
+        if not self.query:
+            return []
+
+        query = self.query
+
+        if self._ignore_case(query):
+            text = text.lower()
+
+        spans = []
+
+        start = text.find(query)
+
+        while start >= 0:
+            spans.append((start, start + len(query)))
+
+            start = text.find(query, start + len(query))
+
+        return spans
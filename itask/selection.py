@@ -6,9 +6,15 @@ class Selection(object):
 
     def __init__(self, active_line, constraints={'top': None, 'bottom': None}):
         self.active_line = active_line
-        self.selected_lines = []
+        self.selected_lines = set()
         self._constraints = constraints.copy()
-        self._listeners = {'changed': []}
+
+        # Where the range being selected (see toggle_range) started, None
+        # when no range is being selected
+        self.anchor = None
+
+        self._listeners = {'changed': [], 'toggled': [], 'cleared': [],
+                           'bulk changed': []}
 
     def register_listener(self, event, listener):
         self._listeners[event].append(listener)
@@ -20,6 +26,23 @@ class Selection(object):
         for listener in self._listeners[event]:
             listener(origin=self, *args, **kwargs)
 
+    def set_constraints(self, constraints):
+        """
+            Replaces the constraints, bringing the active line inside the new
+            ones. Listeners aren't notified, the viewers are expected to be
+            repainted anyway.
+        """
+        self._constraints = constraints.copy()
+
+        self.active_line = self._clamp(self.active_line)
+
+    def _clamp(self, line):
+        if self._constraints['top'] and self._constraints['bottom']:
+            line = min(line, self._constraints['bottom'] - 1)
+            line = max(line, self._constraints['top'])
+
+        return line
+
     def _is_new_active_line_valid(self, new_line):
         if self._constraints['top'] and self._constraints['bottom']:
             return new_line in range(self._constraints['top'],
@@ -36,6 +59,14 @@ class Selection(object):
             new_line = self.active_line + cells
         elif action == 'up':
             new_line = self.active_line - cells
+        elif action == 'set':
+            new_line = cells
+
+        if action in ('down', 'up', 'set'):
+            new_line = self._clamp(new_line)
+
+            if new_line == self.active_line:
+                return False
 
         if self._is_new_active_line_valid(new_line):
             old_line = self.active_line
@@ -49,14 +80,82 @@ class Selection(object):
 
         return False
 
+    @property
+    def range(self):
+        """
+            First and last lines of the range being selected, or None.
+        """
+        if self.anchor is None:
+            return None
+
+        return (min(self.anchor, self.active_line),
+                max(self.anchor, self.active_line))
+
+    def is_selected(self, line):
+        if line in self.selected_lines:
+            return True
+
+        line_range = self.range
+
+        return line_range is not None and \
+            line_range[0] <= line <= line_range[1]
+
+    def lines(self):
+        """
+            Returns the selected lines (including the range being selected) in
+            order.
+        """
+        lines = set(self.selected_lines)
+
+        if self.anchor is not None:
+            first, last = self.range
+            lines.update(range(first, last + 1))
+
+        return sorted(lines)
+
     def toggle_active_line_selected(self):
         if self.active_line not in self.selected_lines:
-            self.selected_lines.append(self.active_line)
+            self.selected_lines.add(self.active_line)
         else:
             self.selected_lines.remove(self.active_line)
 
-        # FIXME Generate another event for this case
-        self._notify_listeners('changed', old_line=-1, new_line=-1)
+        self._notify_listeners('toggled', line=self.active_line)
+
+    def toggle_range(self):
+        """
+            Starts selecting a range from the active line (moving the active
+            line extends it), or adds the range being selected to the
+            selection.
+        """
+        if self.anchor is None:
+            self.anchor = self.active_line
+
+            self._notify_listeners('toggled', line=self.active_line)
+        else:
+            self.selected_lines.update(self.lines())
+            self.anchor = None
+
+    def _data_lines(self):
+        if self._constraints['top'] is None or \
+                self._constraints['bottom'] is None:
+            return range(0)
+
+        return range(self._constraints['top'], self._constraints['bottom'])
+
+    def invert(self):
+        self.selected_lines.symmetric_difference_update(self._data_lines())
+        self.anchor = None
+
+        self._notify_listeners('bulk changed')
+
+    def select_all(self):
+        self.selected_lines.update(self._data_lines())
+        self.anchor = None
+
+        self._notify_listeners('bulk changed')
 
     def clear(self):
-        self.selected_lines = []
+        self.selected_lines = set()
+        self.anchor = None
+
+        self._notify_listeners('cleared')
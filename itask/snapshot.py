@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+def cache_directory():
+    """
+        Directory of the files itask caches between runs
+        ($XDG_CACHE_HOME/itask).
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.expanduser('~/.cache')
+
+    return os.path.join(cache_home, 'itask')
+
+
+def file_stamp(file_names):
+    """
+        Returns the modification times of file_names (None for missing
+        files).
+    """
+    stamp = []
+
+    for file_name in file_names:
+        try:
+            stamp.append(os.stat(file_name).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+
+    return stamp
+
+
+class Snapshot(object):
+
+    def __init__(self, key, text, stamp, title=''):
+        """
+            key: What the report shows (see SnapshotStore).
+            text: The report text, as shown on the data area.
+            stamp: file_stamp() of the data files when the report was loaded.
+            title: The menu title shown along with the report.
+        """
+        self.key = key
+        self.text = text
+        self.stamp = stamp
+        self.title = title
+
+
+class SnapshotStore(object):
+    """
+        The last report shown for each key (task data, context, report,
+        filters...), one JSON file for each in the cache directory, so the
+        next run can paint it before the report is loaded again.
+
+        Errors reading or writing the files are ignored: a snapshot is only a
+        way to show something sooner.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(cache_directory(),
+                                                   'snapshots')
+
+    def _path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+        return os.path.join(self.directory, f'{digest}.json')
+
+    def load(self, key):
+        """
+            Returns the Snapshot saved for key, or None.
+        """
+        key = list(key)
+
+        try:
+            with open(self._path(key), encoding='utf-8') as file:
+                content = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(content, dict) or content.get('key') != key:
+            return None
+
+        return Snapshot(key, content.get('text', ''), content.get('stamp'),
+                        content.get('title', ''))
+
+    def save(self, snapshot):
+        content = {
+                'key': list(snapshot.key),
+                'text': snapshot.text,
+                'stamp': snapshot.stamp,
+                'title': snapshot.title,
+                }
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # Written aside and then renamed, so a reader never sees half of
+            # it
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory,
+                                                     suffix='.tmp')
+
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                json.dump(content, file)
+
+            os.replace(temporary, self._path(snapshot.key))
+        except OSError:
+            pass
@@ -0,0 +1,846 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import operator
+import re
+from datetime import datetime, timedelta, timezone
+
+from itask.taskrecord import DATE_ATTRIBUTES
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _local_now():
+    return datetime.now().astimezone()
+
+
+def _days_from_today(date):
+    """
+        Days between today and the (local) day of date.
+    """
+    return (date.astimezone().date() - _local_now().date()).days
+
+
+def _due_in(task, first_day, last_day):
+    return task.due is not None and \
+        first_day <= _days_from_today(task.due) <= last_day
+
+
+def _same_period(date, period):
+    if date is None:
+        return False
+
+    date = date.astimezone()
+    today = _local_now()
+
+    if period == 'week':
+        return date.isocalendar()[:2] == today.isocalendar()[:2]
+    elif period == 'month':
+        return (date.year, date.month) == (today.year, today.month)
+
+    return date.year == today.year
+
+
+VIRTUAL_TAGS = {
+        'PENDING': lambda task: task.status == 'pending',
+        'WAITING': lambda task: task.status == 'waiting' or (
+            task.wait is not None and task.wait > _now()),
+        'COMPLETED': lambda task: task.status == 'completed',
+        'DELETED': lambda task: task.status == 'deleted',
+        'ACTIVE': lambda task: task.start is not None,
+        'ANNOTATED': lambda task: len(task.annotations) > 0,
+        'TAGGED': lambda task: len(task.tags) > 0,
+        'SCHEDULED': lambda task: task.scheduled is not None,
+        'UNTIL': lambda task: task.until is not None,
+        'PROJECT': lambda task: task.project is not None,
+        'PRIORITY': lambda task: task.priority is not None,
+        'PARENT': lambda task: task.status == 'recurring',
+        'CHILD': lambda task: 'parent' in task.attributes,
+        'OVERDUE': lambda task: task.status == 'pending' and
+        task.due is not None and task.due < _now(),
+        'DUE': lambda task: task.status == 'pending' and
+        _due_in(task, 0, 7),
+        'TODAY': lambda task: _due_in(task, 0, 0),
+        'DUETODAY': lambda task: _due_in(task, 0, 0),
+        'TOMORROW': lambda task: _due_in(task, 1, 1),
+        'YESTERDAY': lambda task: _due_in(task, -1, -1),
+        'WEEK': lambda task: _same_period(task.due, 'week'),
+        'MONTH': lambda task: _same_period(task.due, 'month'),
+        'YEAR': lambda task: _same_period(task.due, 'year'),
+        }
+
+# Virtual tags which are just a status, looked up on the status index
+_STATUS_TAGS = {
+        'PENDING': 'pending',
+        'COMPLETED': 'completed',
+        'DELETED': 'deleted',
+        }
+
+_STRING_ATTRIBUTES = ('description', 'status', 'project', 'priority',
+                      'recur', 'uuid', 'parent')
+_LIST_ATTRIBUTES = ('tags', 'depends')
+_NUMBER_ATTRIBUTES = ('id', 'urgency')
+
+_ATTRIBUTES = _STRING_ATTRIBUTES + _LIST_ATTRIBUTES + _NUMBER_ATTRIBUTES + \
+    DATE_ATTRIBUTES
+
+# Attributes kept in TaskIndex
+_INDEXED_ATTRIBUTES = ('status', 'project', 'tags', 'id', 'uuid')
+
+_MODIFIERS = {
+        'is': 'is', 'equals': 'is',
+        'isnt': 'isnt', 'not': 'isnt',
+        'has': 'has', 'contains': 'has',
+        'hasnt': 'hasnt',
+        'startswith': 'startswith', 'left': 'startswith',
+        'endswith': 'endswith', 'right': 'endswith',
+        'before': 'before', 'under': 'before', 'below': 'before',
+        'after': 'after', 'over': 'after', 'above': 'after',
+        'by': 'by',
+        'none': 'none',
+        'any': 'any',
+        'word': 'word',
+        'noword': 'noword',
+        }
+
+# Shortest abbreviation accepted for attribute and modifier names (as the
+# abbreviation.minimum default of Taskwarrior)
+_ABBREVIATION_MINIMUM = 2
+
+_ATTRIBUTE_TERM = re.compile(r'([a-z_]+)(?:\.([a-z]+))?:(.*)$', re.DOTALL)
+_IDS = re.compile(r'\d+(-\d+)?(,\d+(-\d+)?)*$')
+_UUID = re.compile(r'[0-9a-f]{8}(-[0-9a-f]{4}){0,3}(-[0-9a-f]{12})?$')
+_RELATIVE_DATE = re.compile(r'([a-z]+)(?:([+-])(\d+)([a-z]+))?$')
+
+_DURATION_UNITS = {
+        's': 1, 'sec': 1, 'secs': 1, 'seconds': 1,
+        'min': 60, 'mins': 60, 'minutes': 60,
+        'h': 3600, 'hrs': 3600, 'hours': 3600,
+        'd': 86400, 'day': 86400, 'days': 86400,
+        'w': 604800, 'wk': 604800, 'weeks': 604800,
+        }
+
+_WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+             'saturday', 'sunday')
+
+
+class UnsupportedFilter(Exception):
+    pass
+
+
+def _expand(name, names, token):
+    """
+        Returns the entry of names abbreviated by name.
+    """
+    if name in names:
+        return name
+
+    if len(name) >= _ABBREVIATION_MINIMUM:
+        candidates = [candidate for candidate in names
+                      if candidate.startswith(name)]
+
+        if len(candidates) == 1:
+            return candidates[0]
+
+    raise UnsupportedFilter(token)
+
+
+def _start_of_day(date):
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _start_of_next_month(date):
+    if date.month == 12:
+        return date.replace(year=date.year + 1, month=1, day=1)
+
+    return date.replace(month=date.month + 1, day=1)
+
+
+def _date_keyword(keyword, now):
+    today = _start_of_day(now)
+    second = timedelta(seconds=1)
+
+    if keyword == 'now':
+        return now
+    elif keyword in ('today', 'sod'):
+        return today
+    elif keyword == 'eod':
+        return today + timedelta(days=1) - second
+    elif keyword == 'yesterday':
+        return today - timedelta(days=1)
+    elif keyword == 'tomorrow':
+        return today + timedelta(days=1)
+    elif keyword in ('sow', 'eow'):
+        start = today - timedelta(days=today.weekday())
+
+        return start if keyword == 'sow' else \
+            start + timedelta(days=7) - second
+    elif keyword in ('som', 'eom'):
+        start = today.replace(day=1)
+
+        return start if keyword == 'som' else \
+            _start_of_next_month(start) - second
+    elif keyword in ('soy', 'eoy'):
+        start = today.replace(month=1, day=1)
+
+        return start if keyword == 'soy' else \
+            start.replace(year=start.year + 1) - second
+
+    for weekday, name in enumerate(_WEEKDAYS):
+        if keyword in (name, name[:3]):
+            # The next one, a week from now when it is today
+            days = (weekday - today.weekday() - 1) % 7 + 1
+
+            return today + timedelta(days=days)
+
+    return None
+
+
+def parse_date(value):
+    """
+        Parses the dates accepted in filters: ISO dates ("2024-09-25",
+        "2024-09-25T11:19"), named dates ("today", "eow", "friday"...) and
+        named dates plus or minus a duration ("now+3d", "eod-1w").
+
+        Returns an aware datetime, raising UnsupportedFilter for anything
+        else.
+    """
+    try:
+        # Naive dates are in local time
+        return datetime.fromisoformat(value).astimezone()
+    except ValueError:
+        pass
+
+    match = _RELATIVE_DATE.match(value)
+
+    if match:
+        keyword, sign, amount, unit = match.groups()
+
+        date = _date_keyword(keyword, _local_now())
+
+        if date is not None and sign is None:
+            return date
+        elif date is not None and unit in _DURATION_UNITS:
+            offset = timedelta(seconds=int(amount) * _DURATION_UNITS[unit])
+
+            return date + offset if sign == '+' else date - offset
+
+    raise UnsupportedFilter(value)
+
+
+def narrowing(loaded, filters):
+    """
+        Tells whether the filter filters, loaded with more terms appended, can
+        only match fewer tasks than loaded, both being evaluated in their own
+        parentheses (as task does with the filter of the command line).
+
+        The terms appended can't have a top level "or" (which would bind to
+        the last terms of loaded), IDs or UUIDs (which are or'ed with the
+        ones in loaded) or a limit.
+    """
+    loaded = _split_parentheses(loaded or [])
+    filters = _split_parentheses(filters or [])
+
+    if filters[:len(loaded)] != loaded or not _balanced(loaded):
+        return False
+
+    # "a or" followed by "b" is "a or b"
+    if loaded and loaded[-1].lower() in ('or', 'xor'):
+        return False
+
+    depth = 0
+
+    for token in filters[len(loaded):]:
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+
+            if depth < 0:
+                return False
+        elif token.startswith('limit:'):
+            return False
+        elif depth == 0 and (token.lower() in ('or', 'xor') or
+                             _IDS.match(token) or _UUID.match(token)):
+            return False
+
+    return depth == 0
+
+
+def _balanced(tokens):
+    depth = 0
+
+    for token in tokens:
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+
+            if depth < 0:
+                return False
+
+    return depth == 0
+
+
+def _split_parentheses(tokens):
+    split = []
+
+    for token in tokens:
+        while token.startswith('(') and len(token) > 1:
+            split.append('(')
+            token = token[1:]
+
+        closing = 0
+
+        while token.endswith(')') and len(token) > 1:
+            closing += 1
+            token = token[:-1]
+
+        split.append(token)
+        split.extend(')' * closing)
+
+    return split
+
+
+class TaskIndex(object):
+    """
+        Positions of the tasks of a list by attribute value (status, project,
+        tags, id and uuid). The index of an attribute is built the first time
+        it is looked up, and is valid while the list isn't changed.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+
+        self._indexes = dict()
+
+    def _index(self, attribute):
+        index = self._indexes.get(attribute)
+
+        if index is not None:
+            return index
+
+        index = dict()
+
+        if attribute == 'tags':
+            for position, task in enumerate(self.tasks):
+                for tag in task.tags or [None]:
+                    index.setdefault(tag, set()).add(position)
+        else:
+            get = operator.attrgetter(attribute)
+
+            for position, task in enumerate(self.tasks):
+                index.setdefault(get(task), set()).add(position)
+
+        self._indexes[attribute] = index
+
+        return index
+
+    def lookup(self, attribute, value):
+        """
+            Returns the positions of the tasks with value (None: without
+            the attribute).
+        """
+        return self._index(attribute).get(value, set())
+
+    def prefixed(self, attribute, prefix):
+        """
+            Returns the positions of the tasks with a value starting with
+            prefix.
+        """
+        positions = set()
+
+        for value, value_positions in self._index(attribute).items():
+            if value is not None and value.startswith(prefix):
+                positions |= value_positions
+
+        return positions
+
+
+class _Term(object):
+    """
+        A single filter term: a predicate and, when the term can be evaluated
+        on a TaskIndex, a lookup returning the positions of the tasks which
+        can match.
+    """
+
+    __slots__ = ('predicate', '_lookup')
+
+    def __init__(self, predicate, lookup=None):
+        self.predicate = predicate
+        self._lookup = lookup
+
+    def candidates(self, index):
+        return None if self._lookup is None else self._lookup(index)
+
+
+class _And(object):
+
+    __slots__ = ('predicate', '_operands')
+
+    def __init__(self, operands):
+        self._operands = operands
+
+        predicates = tuple(operand.predicate for operand in operands)
+
+        def predicate(task):
+            for test in predicates:
+                if not test(task):
+                    return False
+
+            return True
+
+        self.predicate = predicate
+
+    def candidates(self, index):
+        candidates = None
+
+        for operand in self._operands:
+            operand_candidates = operand.candidates(index)
+
+            if operand_candidates is None:
+                continue
+            elif candidates is None:
+                candidates = operand_candidates
+            else:
+                candidates = candidates & operand_candidates
+
+        return candidates
+
+
+class _Or(object):
+
+    __slots__ = ('predicate', '_operands')
+
+    def __init__(self, operands):
+        self._operands = operands
+
+        predicates = tuple(operand.predicate for operand in operands)
+
+        def predicate(task):
+            for test in predicates:
+                if test(task):
+                    return True
+
+            return False
+
+        self.predicate = predicate
+
+    def candidates(self, index):
+        candidates = set()
+
+        for operand in self._operands:
+            operand_candidates = operand.candidates(index)
+
+            # Any task can match this operand
+            if operand_candidates is None:
+                return None
+
+            candidates = candidates | operand_candidates
+
+        return candidates
+
+
+def _getter(attribute):
+    if attribute == 'parent':
+        return lambda task: task.attributes.get('parent')
+
+    return operator.attrgetter(attribute)
+
+
+def _string_term(attribute, modifier, value, token):
+    get = _getter(attribute)
+    lookup = None
+
+    if modifier is None and value == '':
+        modifier = 'none'
+
+    if modifier in (None, 'startswith'):
+        def predicate(task):
+            actual = get(task)
+
+            return actual is not None and actual.startswith(value)
+
+        if attribute in _INDEXED_ATTRIBUTES:
+            def lookup(index):
+                return index.prefixed(attribute, value)
+    elif modifier == 'is':
+        def predicate(task):
+            return get(task) == value
+
+        if attribute in _INDEXED_ATTRIBUTES:
+            def lookup(index):
+                return index.lookup(attribute, value)
+    elif modifier == 'isnt':
+        def predicate(task):
+            return get(task) != value
+    elif modifier == 'has':
+        def predicate(task):
+            actual = get(task)
+
+            return actual is not None and value in actual
+    elif modifier == 'hasnt':
+        def predicate(task):
+            actual = get(task)
+
+            return actual is None or value not in actual
+    elif modifier == 'endswith':
+        def predicate(task):
+            actual = get(task)
+
+            return actual is not None and actual.endswith(value)
+    elif modifier in ('word', 'noword'):
+        word = re.compile(r'\b{}\b'.format(re.escape(value)))
+        wanted = modifier == 'word'
+
+        def predicate(task):
+            actual = get(task)
+
+            return (actual is not None and
+                    word.search(actual) is not None) == wanted
+    elif modifier in ('none', 'any'):
+        wanted = modifier == 'any'
+
+        def predicate(task):
+            return (get(task) not in (None, '')) == wanted
+
+        if attribute in _INDEXED_ATTRIBUTES and not wanted:
+            def lookup(index):
+                return index.lookup(attribute, None)
+    else:
+        raise UnsupportedFilter(token)
+
+    return _Term(predicate, lookup)
+
+
+def _list_term(attribute, modifier, value, token):
+    get = _getter(attribute)
+    lookup = None
+
+    if modifier is None and value == '':
+        modifier = 'none'
+
+    if modifier in (None, 'is', 'has') and attribute == 'tags':
+        def predicate(task):
+            return value in get(task)
+
+        def lookup(index):
+            return index.lookup(attribute, value)
+    elif modifier in ('isnt', 'hasnt') and attribute == 'tags':
+        def predicate(task):
+            return value not in get(task)
+    elif modifier in ('none', 'any'):
+        wanted = modifier == 'any'
+
+        def predicate(task):
+            return (len(get(task)) > 0) == wanted
+
+        if attribute in _INDEXED_ATTRIBUTES and not wanted:
+            def lookup(index):
+                return index.lookup(attribute, None)
+    else:
+        # Dependencies are given as IDs, which aren't in the records
+        raise UnsupportedFilter(token)
+
+    return _Term(predicate, lookup)
+
+
+def _number_term(attribute, modifier, value, token):
+    get = _getter(attribute)
+
+    try:
+        number = float(value)
+    except ValueError:
+        raise UnsupportedFilter(token)
+
+    compare = {
+            None: operator.eq,
+            'is': operator.eq,
+            'isnt': operator.ne,
+            'before': operator.lt,
+            'after': operator.gt,
+            }.get(modifier)
+
+    if compare is None:
+        raise UnsupportedFilter(token)
+
+    def predicate(task):
+        return compare(get(task), number)
+
+    lookup = None
+
+    if attribute == 'id' and compare is operator.eq and number.is_integer():
+        def lookup(index):
+            return index.lookup('id', int(number))
+
+    return _Term(predicate, lookup)
+
+
+def _date_term(attribute, modifier, value, token):
+    get = _getter(attribute)
+
+    if modifier is None and value == '':
+        modifier = 'none'
+
+    if modifier in ('none', 'any'):
+        wanted = modifier == 'any'
+
+        def predicate(task):
+            return (get(task) is not None) == wanted
+
+        return _Term(predicate)
+
+    date = parse_date(value)
+
+    if modifier in (None, 'is', 'isnt'):
+        # Dates are equal when they fall on the same day
+        start = _start_of_day(date)
+        end = start + timedelta(days=1)
+        wanted = modifier != 'isnt'
+
+        def predicate(task):
+            actual = get(task)
+
+            return (actual is not None and start <= actual < end) == wanted
+    else:
+        compare = {
+                'before': operator.lt,
+                'after': operator.gt,
+                'by': operator.le,
+                }.get(modifier)
+
+        if compare is None:
+            raise UnsupportedFilter(token)
+
+        def predicate(task):
+            actual = get(task)
+
+            return actual is not None and compare(actual, date)
+
+    return _Term(predicate)
+
+
+def _attribute_term(token):
+    match = _ATTRIBUTE_TERM.match(token)
+
+    if not match:
+        raise UnsupportedFilter(token)
+
+    attribute, modifier, value = match.groups()
+
+    # Configuration overrides and user defined attributes are left to task
+    attribute = _expand(attribute, _ATTRIBUTES, token)
+
+    if modifier is not None:
+        modifier = _MODIFIERS[_expand(modifier, _MODIFIERS, token)]
+
+    if attribute in _LIST_ATTRIBUTES:
+        return _list_term(attribute, modifier, value, token)
+    elif attribute in _NUMBER_ATTRIBUTES:
+        return _number_term(attribute, modifier, value, token)
+    elif attribute in DATE_ATTRIBUTES:
+        return _date_term(attribute, modifier, value, token)
+
+    return _string_term(attribute, modifier, value, token)
+
+
+def _tag_term(token):
+    tag = token[1:]
+    wanted = token[0] == '+'
+
+    lookup = None
+
+    if tag in VIRTUAL_TAGS:
+        test = VIRTUAL_TAGS[tag]
+
+        if wanted and tag in _STATUS_TAGS:
+            def lookup(index):
+                return index.lookup('status', _STATUS_TAGS[tag])
+    elif tag.isupper():
+        # Virtual tags which need more than the task itself (BLOCKED...)
+        raise UnsupportedFilter(token)
+    else:
+        def test(task):
+            return tag in task.tags
+
+        if wanted:
+            def lookup(index):
+                return index.lookup('tags', tag)
+
+    if wanted:
+        return _Term(test, lookup)
+
+    return _Term(lambda task: not test(task))
+
+
+def _ids_term(token):
+    ids = set()
+
+    for ids_range in token.split(','):
+        first, _, last = ids_range.partition('-')
+
+        ids.update(range(int(first), int(last or first) + 1))
+
+    def predicate(task):
+        return task.id in ids
+
+    def lookup(index):
+        positions = set()
+
+        for id in ids:
+            positions |= index.lookup('id', id)
+
+        return positions
+
+    return _Term(predicate, lookup)
+
+
+def _uuid_term(token):
+    def predicate(task):
+        return task.uuid is not None and task.uuid.startswith(token)
+
+    def lookup(index):
+        return index.prefixed('uuid', token)
+
+    return _Term(predicate, lookup)
+
+
+def _word_term(token):
+    def predicate(task):
+        return token in task.description or \
+            any(token in annotation for _, annotation in task.annotations)
+
+    return _Term(predicate)
+
+
+class TaskFilter(object):
+    """
+        A Taskwarrior filter compiled to a predicate over TaskRecords. It
+        supports this subset of the filter language:
+
+            attribute[.modifier]:value  Attribute comparisons (the project,
+                                        description... "attribute:value" is a
+                                        left match, dates are equal on the
+                                        same day)
+            +tag, -tag                  Tags and the per task virtual tags
+            12, 1-5,7, 8e2fa1c2         IDs and UUIDs (or'ed together)
+            and, or, ( )                Operators, "and" being implicit
+            limit:N                     The limit of the report
+            word                        Description and annotations contain
+
+        and raises UnsupportedFilter for anything else (user defined
+        attributes, regular expressions, algebraic expressions...), which
+        must be left to task.
+    """
+
+    def __init__(self, tokens):
+        self.limit = None
+
+        self._tokens = _split_parentheses(tokens or [])
+        self._position = 0
+
+        expression = self._parse_or() if self._tokens else None
+
+        if self._position < len(self._tokens):
+            raise UnsupportedFilter(self._tokens[self._position])
+
+        self._expression = expression
+
+        self.predicate = self._expression.predicate \
+            if self._expression is not None else (lambda task: True)
+
+    def matches(self, task):
+        return self.predicate(task)
+
+    def select(self, tasks, index=None):
+        """
+            Returns the tasks matching the filter, in order.
+
+            index: TaskIndex of tasks, narrowing down the tasks tested.
+        """
+        predicate = self.predicate
+
+        if index is not None and self._expression is not None:
+            candidates = self._expression.candidates(index)
+
+            if candidates is not None:
+                return [tasks[position] for position in sorted(candidates)
+                        if predicate(tasks[position])]
+
+        return [task for task in tasks if predicate(task)]
+
+    # Parsing (or_expression: and_expression ("or" and_expression)*)
+    def _peek(self):
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+
+        return None
+
+    def _next(self):
+        token = self._peek()
+        self._position += 1
+
+        return token
+
+    def _parse_or(self):
+        operands = [self._parse_and()]
+
+        while self._peek() is not None and self._peek().lower() == 'or':
+            self._next()
+            operands.append(self._parse_and())
+
+        return operands[0] if len(operands) == 1 else _Or(operands)
+
+    def _parse_and(self):
+        operands = []
+        ids = []
+
+        while True:
+            token = self._peek()
+
+            if token is None or token == ')' or token.lower() == 'or':
+                break
+            elif token.lower() == 'and':
+                self._next()
+                continue
+            elif token.startswith('limit:'):
+                self._next()
+                self.limit = token[len('limit:'):]
+                continue
+
+            self._next()
+
+            if token == '(':
+                operands.append(self._parse_or())
+
+                if self._next() != ')':
+                    raise UnsupportedFilter(token)
+            elif _IDS.match(token):
+                ids.append(_ids_term(token))
+            elif _UUID.match(token):
+                ids.append(_uuid_term(token))
+            else:
+                operands.append(self._parse_term(token))
+
+        if ids:
+            operands.append(ids[0] if len(ids) == 1 else _Or(ids))
+
+        if not operands:
+            # Empty operand, like "()" or "a or"
+            return _Term(lambda task: True)
+
+        return operands[0] if len(operands) == 1 else _And(operands)
+
+    def _parse_term(self, token):
+        if token[:1] in ('+', '-') and len(token) > 1:
+            return _tag_term(token)
+        elif ':' in token:
+            return _attribute_term(token)
+        elif token.lower() in ('xor', 'not') or \
+                re.search(r'[<>=~!/]', token):
+            raise UnsupportedFilter(token)
+
+        return _word_term(token)
+
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timezone
+
+DATE_ATTRIBUTES = ('entry', 'modified', 'start', 'end', 'due', 'wait',
+                   'scheduled', 'until')
+
+
+def parse_date(value):
+    """
+        Parses both date formats used by Taskwarrior: ISO basic format from
+        "task export" ("20240925T111930Z") and epoch seconds from the data
+        files ("1463442354").
+    """
+    if value is None or value == '':
+        return None
+
+    if value.isdigit():
+        return datetime.fromtimestamp(int(value), timezone.utc)
+
+    return datetime.strptime(value, '%Y%m%dT%H%M%SZ') \
+        .replace(tzinfo=timezone.utc)
+
+
+class TaskRecord(object):
+
+    def __init__(self, attributes):
+        """
+            attributes: A dictionary of raw task attributes, as found on a
+                "task export" entry.
+        """
+        self.attributes = attributes
+
+        self.id = int(attributes.get('id', 0))
+        self.uuid = attributes.get('uuid')
+        self.description = attributes.get('description', '')
+        self.status = attributes.get('status')
+        self.project = attributes.get('project')
+        self.priority = attributes.get('priority')
+        self.recur = attributes.get('recur')
+        self.tags = list(attributes.get('tags', []))
+        self.depends = list(attributes.get('depends', []))
+        self.urgency = float(attributes.get('urgency', 0))
+
+        for attribute in DATE_ATTRIBUTES:
+            setattr(self, attribute, parse_date(attributes.get(attribute)))
+
+        self.annotations = [(parse_date(annotation.get('entry')),
+                             annotation.get('description', ''))
+                            for annotation in attributes.get('annotations', [])]
+
+    @classmethod
+    def from_export(cls, data):
+        return cls(data)
+
+    def get(self, attribute, default=None):
+        if hasattr(self, attribute) and attribute != 'attributes':
+            value = getattr(self, attribute)
+        else:
+            value = self.attributes.get(attribute)
+
+        return default if value is None else value
+
+    def __repr__(self):
+        return f'TaskRecord(id={self.id}, uuid={self.uuid!r})'
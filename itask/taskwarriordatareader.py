@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import re
+
+_attribute_pattern = re.compile(r'([^\s:\[\]]+):"((?:[^"\\]|\\.)*)"')
+
+# Bytes at the end of what was parsed compared to tell an append from a
+# rewrite
+_TAIL_SIZE = 4096
+
+
+def _decode_value(raw):
+    if '&' in raw:
+        raw = raw.replace('&open;', '[').replace('&close;', ']') \
+                 .replace('&dquot;', '\\"')
+
+    if '\\' in raw:
+        return json.loads(f'"{raw}"', strict=False)
+
+    return raw
+
+
+def parse_line(line):
+    """
+        Parses a FF4 line ('[key:"value" ...]') into a dictionary shaped like
+        a "task export" entry.
+    """
+    attributes = dict()
+    annotations = []
+
+    for key, raw in _attribute_pattern.findall(line):
+        value = _decode_value(raw)
+
+        if key.startswith('annotation_'):
+            annotations.append({'entry': key[len('annotation_'):],
+                                'description': value})
+        elif key in ('tags', 'depends'):
+            attributes[key] = [item for item in value.split(',') if item]
+        elif key.startswith('tags_') or key.startswith('dep_'):
+            # Taskwarrior 2.6 duplicates tags and dependencies like this
+            continue
+        else:
+            attributes[key] = value
+
+    if annotations:
+        attributes['annotations'] = sorted(annotations,
+                                           key=lambda a: int(a['entry']))
+
+    return attributes
+
+
+class TaskwarriorDataReader(object):
+    """
+        Reads a Taskwarrior data file (pending.data, completed.data).
+
+        Successive calls to read() only parse what changed since the previous
+        one: appended lines when the file just grew (the end of what was parsed
+        being unchanged), otherwise only the lines that are not identical to a
+        line already parsed.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+        self._lines = []
+        self._entries = []
+
+        self._stat = None
+        self._consumed = 0
+        self._tail = b''
+
+    def read(self):
+        """
+            Returns the list of task attribute dictionaries, in file order.
+        """
+        try:
+            stat = os.stat(self.file_name)
+        except OSError:
+            self._reset()
+
+            return self._entries
+
+        signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+        if signature == self._stat:
+            return self._entries
+
+        with open(self.file_name, 'rb') as file:
+            if not self._read_appended(file, stat):
+                file.seek(0)
+
+                self._read_all(file.read())
+
+        self._stat = signature
+
+        return self._entries
+
+    def _reset(self):
+        self._lines = []
+        self._entries = []
+        self._stat = None
+        self._consumed = 0
+        self._tail = b''
+
+    def _read_appended(self, file, stat):
+        if self._stat is None or stat.st_ino != self._stat[0] \
+                or stat.st_size <= self._consumed:
+            return False
+
+        # Rewriting the file moves what ended the parsed part (lines rewritten
+        # in place keep the size of the file)
+        file.seek(self._consumed - len(self._tail))
+
+        if file.read(len(self._tail)) != self._tail:
+            return False
+
+        data = file.read()
+
+        complete = data.rfind(b'\n') + 1
+
+        for raw_line in data[:complete].splitlines():
+            self._append_line(raw_line)
+
+        self._consumed += complete
+        self._tail = (self._tail + data[:complete])[-_TAIL_SIZE:]
+
+        return True
+
+    def _read_all(self, data):
+        previous = dict(zip(self._lines, self._entries))
+
+        self._lines = []
+        self._entries = []
+
+        complete = data.rfind(b'\n') + 1
+
+        for raw_line in data[:complete].splitlines():
+            entry = previous.get(raw_line)
+
+            if entry is None:
+                self._append_line(raw_line)
+            else:
+                self._lines.append(raw_line)
+                self._entries.append(entry)
+
+        self._consumed = complete
+        self._tail = data[max(complete - _TAIL_SIZE, 0):complete]
+
+    def _append_line(self, raw_line):
+        if not raw_line.strip():
+            return
+
+        self._lines.append(raw_line)
+        self._entries.append(parse_line(raw_line.decode('utf-8')))
@@ -1,19 +1,31 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import json
 import os
 import shutil
 import subprocess
 import re
 
+from itask.backend import Backend
+from itask.commandcache import CommandCache
+from itask.configsnapshot import ConfigSnapshot, include_chain
+from itask.taskrecord import TaskRecord
+
 taskwarrior_binary = shutil.which('task')
 
+DATA_FILES = ['pending.data', 'completed.data', 'undo.data']
+
+
+class TaskwarriorWrapper(Backend):
+    """
+        Backend which runs the task binary for everything.
+    """
 
-class TaskwarriorWrapper(object):
+    def __init__(self, task_data=None, context=None, binary=None):
+        super(TaskwarriorWrapper, self).__init__(context)
 
-    def __init__(self, task_data=None, context=None):
-        # TODO Its possible to improve this with more specific events
-        self._listeners = {'data changed': []}
+        self._binary = binary or taskwarrior_binary
 
         if task_data:
             self._environment = os.environ.copy()
@@ -21,10 +33,11 @@ class TaskwarriorWrapper(object):
         else:
             self._environment = None
 
-        self._context = context
-
-        if self._context is None:
-            self._context = self.get_external_context()
+        # Read commands outside the config snapshot ("task reports"); the
+        # configuration queries moved to _config_cache
+        self._cache = CommandCache(self.watched_files())
+        self._config_cache = CommandCache(include_chain(self.taskrc_file()))
+        self.register_listener('data changed', self._clear_cache)
 
     def _auto_args(self):
         if self._context is not None:
@@ -32,100 +45,152 @@ class TaskwarriorWrapper(object):
         else:
             return []
 
-    def _internal_run(self, args, redirect_stdouterr=False):
-        stdout = subprocess.PIPE if redirect_stdouterr else None
-        stderr = subprocess.PIPE if redirect_stdouterr else None
+    def _getenv(self, name, default=None):
+        environment = self._environment or os.environ
 
-        process_args = [taskwarrior_binary] + self._auto_args() + args
+        return environment.get(name, default)
 
-        process = subprocess.run(process_args, env=self._environment,
-                                 stdout=stdout, stderr=stderr)
+    def taskrc_file(self):
+        taskrc = self._getenv('TASKRC')
 
-        return process
+        if taskrc:
+            return os.path.expanduser(taskrc)
 
-    def _parse_table(self, raw_stdout):
-        stdout = raw_stdout.decode().split('\n')
+        taskrc = os.path.expanduser('~/.taskrc')
 
-        stdout = stdout[2:-2]
+        if not os.path.exists(taskrc):
+            xdg_config = self._getenv('XDG_CONFIG_HOME',
+                                      os.path.expanduser('~/.config'))
+            xdg_taskrc = os.path.join(xdg_config, 'task', 'taskrc')
 
-        items = dict()
+            if os.path.exists(xdg_taskrc):
+                return xdg_taskrc
 
-        for line in stdout:
-            matchs = re.match(r'^([a-z0-9_\.]+) +(.*)', line)
-            if matchs:
-                groups = matchs.groups()
-                key = groups[0]
-                value = groups[1]
-                items[key] = value
+        return taskrc
 
-        return items
+    def data_location(self):
+        task_data = self._getenv('TASKDATA')
 
-    def register_listener(self, event, listener):
-        self._listeners[event].append(listener)
+        if task_data:
+            return os.path.expanduser(task_data)
 
-    def remove_listener(self, event, listener):
-        self._listeners[event].delete(listener)
+        try:
+            with open(self.taskrc_file()) as taskrc:
+                for line in taskrc:
+                    match = re.match(r'^\s*data\.location\s*=\s*(.*?)\s*$',
+                                     line)
+                    if match:
+                        location = os.path.expandvars(match.groups()[0])
 
-    def _notify_listeners(self, event, *args, **kwargs):
-        for listener in self._listeners[event]:
-            listener(origin=self, *args, **kwargs)
+                        return os.path.expanduser(location)
+        except OSError:
+            pass
 
-    def get_external_context(self):
-        process = self._internal_run(['context', 'show'],
-                                     redirect_stdouterr=True)
+        return os.path.expanduser('~/.task')
 
-        stdout = process.stdout.decode().split('\n')
+    def watched_files(self):
+        data_location = self.data_location()
 
-        first_line = stdout[0]
+        data_files = [os.path.join(data_location, file_name)
+                      for file_name in DATA_FILES]
 
-        match = re.match(r'Context \'(.*)\' with', first_line)
+        return data_files + [self.taskrc_file()]
 
-        if not match:
-            return None
+    def _clear_cache(self, origin):
+        self._cache.clear()
 
-        return match.groups()[0]
+    def _internal_run(self, args, redirect_stdouterr=False, auto_args=True):
+        stdout = subprocess.PIPE if redirect_stdouterr else None
+        stderr = subprocess.PIPE if redirect_stdouterr else None
 
-    def get_context(self):
-        return self._context
+        process_args = [self._binary]
 
-    def set_context(self, context):
-        self._context = context
+        if auto_args:
+            process_args += self._auto_args()
 
-    def contexts(self):
-        process = self._internal_run(['show', 'context.'],
-                                     redirect_stdouterr=True)
+        process_args += args
 
-        raw = self._parse_table(process.stdout)
+        process = subprocess.run(process_args, env=self._environment,
+                                 stdout=stdout, stderr=stderr)
 
-        contexts_ = dict()
+        return process
 
-        for key, value in raw.items():
-            tokens = key.split('.')
-            name = tokens[1]
+    def _cached_run(self, args):
+        """
+            Runs a read only command, reusing its output until the data files
+            or the taskrc change or itask changes the data itself.
+        """
+        cache_key = self._auto_args() + args
+
+        return self._cache.get(
+            cache_key,
+            lambda: self._internal_run(args, redirect_stdouterr=True))
+
+    def config(self):
+        """
+            Returns a ConfigSnapshot with the whole Taskwarrior configuration.
+            It is only reloaded when the taskrc (or a file it includes)
+            changes.
+        """
+        return self._config_cache.get(['_show'], self._load_config)
+
+    def _load_config(self):
+        # Without rc.context, so the "context" entry holds the external one
+        process = self._internal_run(['_show'], redirect_stdouterr=True,
+                                     auto_args=False)
+
+        return ConfigSnapshot.parse(process.stdout.decode())
+
+    def _load_params(self, report, filters):
+        params = ['rc.defaultwidth:', 'rc._forcecolor:off', 'rc.color:off']
 
-            active = self._context == name
+        if report:
+            params += [report]
 
-            context = contexts_.setdefault(name, {'name': name,
-                                                  'active': active})
+        if filters:
+            params += filters
 
-            prop = tokens[2]
+        return params
 
-            context[prop] = value
+    def _load(self, report, filters):
+        process = self._internal_run(self._load_params(report, filters),
+                                     redirect_stdouterr=True)
 
-        return contexts_.values()
+        return process.stdout.decode()
 
-    def load(self, report, filters):
-        params = ['rc.defaultwidth:', 'rc._forcecolor:off', 'rc.color:off']
+    def _load_stream(self, report, filters):
+        process_args = [self._binary] + self._auto_args() + \
+            self._load_params(report, filters)
 
-        if report:
-            params += [report]
+        with subprocess.Popen(process_args, env=self._environment,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL) as process:
+            last_line = b''
+
+            for raw_line in process.stdout:
+                if raw_line.endswith(b'\n'):
+                    yield raw_line[:-1].decode()
+                else:
+                    last_line = raw_line
+
+            yield last_line.decode()
+
+    def _export(self, report, filters):
+        params = ['rc.json.array:on']
 
         if filters:
             params += filters
 
+        params += ['export']
+
+        if report:
+            params += [report]
+
         process = self._internal_run(params, redirect_stdouterr=True)
 
-        return process.stdout.decode()
+        raw = json.loads(process.stdout.decode() or '[]')
+
+        return [TaskRecord.from_export(data) for data in raw]
 
     def add(self, parameters):
         self._internal_run(['add'] + parameters)
@@ -166,44 +231,25 @@ class TaskwarriorWrapper(object):
         self._notify_listeners('data changed')
 
     def reports(self):
-        # TODO Usar o _parse_table
-        process = self._internal_run(['reports'], redirect_stdouterr=True)
-
-        stdout = process.stdout.decode().split('\n')
+        """
+            Lists the reports of "task reports", which has the built in ones
+            without a description in the configuration too.
+        """
+        reports = super(TaskwarriorWrapper, self).reports()
 
-        stdout = stdout[2:-2]
+        process = self._cached_run(['reports'])
 
-        reports = dict()
+        # Between the header and the report count
+        for line in process.stdout.decode().split('\n')[2:-2]:
+            match = re.match(r'^([a-z0-9_\.]+) +(.*)', line)
 
-        for line in stdout:
-            matchs = re.match(r'^([a-z0-9_\.]+) +(.*)', line)
-            if matchs:
-                groups = matchs.groups()
-                reports[groups[0]] = groups[1]
+            if match:
+                reports[match.group(1)] = match.group(2)
 
-        return reports
+        return dict(sorted(reports.items()))
 
     def projects(self):
         self._internal_run(['projects'])
 
     def tags(self):
         self._internal_run(['tags'])
-
-    def get_config(self, config, default=None):
-        # TODO Usar o _parse_table
-        process = self._internal_run(['show', config], redirect_stdouterr=True)
-
-        stdout = process.stdout.decode().split('\n')
-
-        entry = [line for line in stdout[3:] if line.startswith(config)]
-        if len(entry) == 0:
-            return default
-        else:
-            entry = entry[0]
-
-        separator_index = entry.find(' ')
-
-        return entry[separator_index + 1:] or default
-
-    def invalidate_data(self):
-        self._notify_listeners('data changed')
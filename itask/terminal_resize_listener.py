@@ -8,16 +8,22 @@ class TerminalResizeListener(object):
     def __new__(cls):
         if TerminalResizeListener._instance is None:
             TerminalResizeListener._instance = object.__new__(cls)
+            TerminalResizeListener._instance._initialized = False
 
         return TerminalResizeListener._instance
 
     def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+
         self._listeners = list()
 
         self._previous_handler = signal.signal(signal.SIGWINCH, self._handler)
 
     def _handler(self, signum, stack):
-        if self._previous_handler:
+        if callable(self._previous_handler):
             self._previous_handler(signum, stack)
 
         for listener in self._listeners:
@@ -11,6 +11,9 @@ from itask import console
 viewer_width_default = 'terminal_columns'
 viewer_height_default = 'terminal_lines'
 
+# Encoded rows a Viewer keeps at most (the cache is emptied when full)
+ROW_CACHE_SIZE = 4096
+
 
 class Region(object):
 
@@ -24,9 +27,19 @@ class Region(object):
                 entries.
             vertical_constraints: A dictionary with "left" and "right" entries.
         """
-        self._size = size
+        self._size = size.copy()
         self._position = position.copy()
 
+        self._horizontal_constraints = horizontal_constraints.copy()
+        self._vertical_constraints = vertical_constraints.copy()
+
+        self._update_constraints()
+
+        self._listeners = {'horizontal move': [], 'vertical move': []}
+
+    def _update_constraints(self):
+        horizontal_constraints = self._horizontal_constraints
+
         self._left_constraints = {
                 'min': horizontal_constraints['left'],
                 'max': 0
@@ -35,7 +48,13 @@ class Region(object):
             self._left_constraints['max'] = self._size['width']
         else:
             self._left_constraints['max'] = horizontal_constraints['right']
-        self._left_constraints['max'] -= size['width']
+        self._left_constraints['max'] -= self._size['width']
+
+        # Data smaller than the region is shown from its beginning
+        self._left_constraints['max'] = max(self._left_constraints['max'],
+                                            self._left_constraints['min'])
+
+        vertical_constraints = self._vertical_constraints
 
         self._top_constraints = {'min': vertical_constraints['top'], 'max': 0}
         if vertical_constraints['bottom'] == 'height':
@@ -44,7 +63,8 @@ class Region(object):
             self._top_constraints['max'] = vertical_constraints['bottom']
         self._top_constraints['max'] -= self._size['height']
 
-        self._listeners = {'horizontal move': [], 'vertical move': []}
+        self._top_constraints['max'] = max(self._top_constraints['max'],
+                                           self._top_constraints['min'])
 
     def register_listener(self, event, listener):
         self._listeners[event].append(listener)
@@ -56,7 +76,67 @@ class Region(object):
         for listener in self._listeners[event]:
             listener(origin=self, *args, **kwargs)
 
+    def resize(self, width=None, height=None):
+        """
+            Changes the size in place. The position is kept, unless the new
+            size doesn't fit in the constraints there (listeners are then
+            notified of the move).
+        """
+        if width is not None:
+            self._size['width'] = width
+
+        if height is not None:
+            self._size['height'] = height
+
+        self._update_constraints()
+
+        if width is not None:
+            self._horizontal_move(self._clamp_left(0))
+
+        if height is not None:
+            self._vertical_move(self._clamp_top(0))
+
+    def set_constraints(self, horizontal_constraints=None,
+                        vertical_constraints=None):
+        """
+            Replaces the constraints (None keeps the current ones), moving the
+            region inside the new ones if needed.
+        """
+        if horizontal_constraints is not None:
+            self._horizontal_constraints = horizontal_constraints.copy()
+
+        if vertical_constraints is not None:
+            self._vertical_constraints = vertical_constraints.copy()
+
+        self._update_constraints()
+
+        self._horizontal_move(self._clamp_left(0))
+        self._vertical_move(self._clamp_top(0))
+
+    def _clamp_left(self, cells):
+        """
+            Shortens a horizontal move of cells so it stops at the constraints.
+        """
+        new_left = self._position['left'] + cells
+        new_left = min(new_left, self._left_constraints['max'])
+        new_left = max(new_left, self._left_constraints['min'])
+
+        return new_left - self._position['left']
+
+    def _clamp_top(self, cells):
+        """
+            Shortens a vertical move of cells so it stops at the constraints.
+        """
+        new_top = self._position['top'] + cells
+        new_top = min(new_top, self._top_constraints['max'])
+        new_top = max(new_top, self._top_constraints['min'])
+
+        return new_top - self._position['top']
+
     def _horizontal_move(self, cells):
+        if not cells:
+            return False
+
         new_left = self._position['left'] + cells
 
         if new_left in range(self._left_constraints['min'],
@@ -73,6 +153,9 @@ class Region(object):
         return False
 
     def _vertical_move(self, cells):
+        if not cells:
+            return False
+
         new_top = self._position['top'] + cells
 
         if new_top in range(self._top_constraints['min'],
@@ -93,18 +176,22 @@ class Region(object):
             diff = cells - self._position['top']
 
             return self._vertical_move(diff)
+        elif direction == 'set left':
+            diff = cells - self._position['left']
+
+            return self._horizontal_move(diff)
         elif direction == 'set bottom':
             diff = cells - self._position['top'] - self._size['height'] + 1
 
             return self._vertical_move(diff)
         elif direction == 'left':
-            return self._horizontal_move(-1)
+            return self._horizontal_move(self._clamp_left(-cells))
         elif direction == 'right':
-            return self._horizontal_move(1)
+            return self._horizontal_move(self._clamp_left(cells))
         elif direction == 'up':
-            return self._vertical_move(-1)
+            return self._vertical_move(self._clamp_top(-cells))
         elif direction == 'down':
-            return self._vertical_move(1)
+            return self._vertical_move(self._clamp_top(cells))
         elif direction == 'top':
             cells_to_top = self._top_constraints['min'] - self._position['top']
 
@@ -169,91 +256,253 @@ class Viewer(object):
 
         if selection:
             selection.register_listener('changed', self.active_line_changed)
+            selection.register_listener('toggled', self.line_toggled)
+            selection.register_listener('cleared', self.selection_cleared)
+            selection.register_listener('bulk changed',
+                                        self.selection_cleared)
 
         self._screen_left = screen_left
         self._screen_top = screen_top
+
+        # _dirty repaints every visible line, otherwise only the lines in
+        # _damaged_lines are repainted
         self._dirty = True
+        self._damaged_lines = set()
+
+        # Vertical move (in lines) not yet reflected on the terminal
+        self._pending_scroll = 0
+
+        # (line index, left, width): line clipped to the region, encoded and
+        # padded (see _encode_row)
+        self._row_cache = dict()
+        self._cache_generation = data_provider.generation
+
+        # Search (see itask.search) whose matches are highlighted
+        self.search = None
+
+    def clear_cache(self):
+        self._row_cache.clear()
 
     def invalidate(self):
         self._dirty = True
 
+    @property
+    def pending_scroll(self):
+        return 0 if self._dirty else self._pending_scroll
+
+    def scrolled(self):
+        """
+            Tells the viewer its lines were shifted on the terminal by
+            pending_scroll (see console.scroll_lines), so only the lines
+            scrolled in need to be painted.
+        """
+        if self._pending_scroll > 0:
+            first_line = self.region.bottom - self._pending_scroll + 1
+
+            self._damaged_lines.update(range(first_line,
+                                             self.region.bottom + 1))
+        else:
+            last_line = self.region.top - self._pending_scroll
+
+            self._damaged_lines.update(range(self.region.top, last_line))
+
+        self._pending_scroll = 0
+
+    @property
+    def screen_top(self):
+        return self._screen_top
+
+    def place(self, screen_left, screen_top):
+        """
+            Moves the viewer on the screen.
+        """
+        if (screen_left, screen_top) != (self._screen_left, self._screen_top):
+            self._screen_left = screen_left
+            self._screen_top = screen_top
+
+            self._dirty = True
+
     def active_line_changed(self, origin, old_line, new_line):
         if new_line > self.region.bottom:
             self.region.move('set bottom', new_line)
         elif new_line < self.region.top:
             self.region.move('set top', new_line)
 
+        if self._selection.anchor is None:
+            self._damaged_lines.update((old_line, new_line))
+        else:
+            # Every line between them went in or out of the range
+            first = max(min(old_line, new_line), self.region.top)
+            last = min(max(old_line, new_line), self.region.bottom)
+
+            self._damaged_lines.update(range(first, last + 1))
+            self._damaged_lines.update((old_line, new_line))
+
+    def line_toggled(self, origin, line):
+        self._damaged_lines.add(line)
+
+    def selection_cleared(self, origin):
         self._dirty = True
 
     def region_vertically_moved(self, origin, old_top, new_top):
-        if self._selection.active_line < origin.top:
-            self._selection.active_line = origin.top
+        if not self._selection:
+            pass
+        elif self._selection.active_line < origin.top:
+            self._selection.move('set', origin.top)
         elif self._selection.active_line > origin.bottom:
-            self._selection.active_line = origin.bottom
+            self._selection.move('set', origin.bottom)
 
-        self._dirty = True
+        if self._dirty:
+            return
+
+        # Moves made before the next frame add up, as long as part of what is
+        # on the terminal can still be reused
+        pending_scroll = self._pending_scroll + new_top - old_top
+
+        if abs(pending_scroll) >= origin.height:
+            self._dirty = True
+
+            return
+
+        self._pending_scroll = pending_scroll
 
     def region_horizontally_moved(self, origin, old_left, new_left):
         self._dirty = True
 
+        # No cached row is going to be used at this left anymore
+        self._row_cache.clear()
+
+    def _encode_row(self, line, left, width):
+        line = line[left:left + width]
+
+        if line != '' and line[-1] == '\n':
+            line = line[:-1]
+
+        row = bytes(line, sys.stdout.encoding)
+
+        if len(line) < width:
+            row += b' ' * (width - len(line))
+
+        return row
+
+    def _highlight_row(self, line, left, width, background):
+        """
+            Returns the row with the search matches highlighted, restoring
+            background (an escape sequence) after each one.
+        """
+        row = []
+        position = left
+
+        for start, end in self.search.spans(line):
+            start = max(start, left)
+            end = min(end, left + width)
+
+            if start >= end:
+                continue
+
+            row.append(bytes(line[position:start], sys.stdout.encoding))
+            row.append(console.SEQUENCE_ESCAPES['search match'])
+            row.append(bytes(line[start:end], sys.stdout.encoding))
+            row.append(background)
+
+            position = end
+
+        rest = line[position:left + width].rstrip('\n')
+        row.append(bytes(rest, sys.stdout.encoding))
+
+        length = position - left + len(rest)
+
+        if length < width:
+            row.append(b' ' * (width - length))
+
+        return b''.join(row)
+
     def update(self):
-        if not self._dirty:
+        lines = self.data_provider.lines
+
+        # Only the visible lines are touched, whatever the size of the data
+        visible_lines = range(self.region.top,
+                              min(self.region.top + self.region.height,
+                                  len(lines)))
+
+        if self._pending_scroll:
+            # Nobody shifted the terminal lines, so all of them are wrong
+            self._dirty = True
+            self._pending_scroll = 0
+
+        # Rows past the end of the data, which may still show longer data
+        # painted before
+        blank_rows = range(0)
+
+        if self._dirty:
+            lines_to_paint = visible_lines
+            blank_rows = range(len(visible_lines), self.region.height)
+        elif self._damaged_lines:
+            lines_to_paint = sorted(line for line in self._damaged_lines
+                                    if line in visible_lines)
+        else:
             return
 
-        read_lines = -1
-        printed_lines = 0
+        if self._cache_generation != self.data_provider.generation:
+            self._cache_generation = self.data_provider.generation
 
-        b_left = bytes(str(self._screen_left + 1), sys.stdout.encoding)
+            self._row_cache.clear()
 
-        for raw_line in self.data_provider.lines:
-            read_lines += 1
+        if len(self._row_cache) > ROW_CACHE_SIZE:
+            self._row_cache.clear()
 
-            if read_lines < self.region.top:
-                continue
+        left = self.region.left
+        width = self.region.width
 
-            line = raw_line[
-                   self.region.left:self.region.left + self.region.width]
+        selection = self._selection
 
-            if line != '' and line[-1] == '\n':
-                line = line[:-1]
+        search = self.search if self.search and self.search.active else None
 
-            b_top = bytes(str(self._screen_top + printed_lines + 1),
-                          sys.stdout.encoding)
+        for line_index in lines_to_paint:
+            screen_line = line_index - self.region.top
 
-            line_itens = [b'\033[', b_top, b';', b_left, b'H']
+            position = console.cursor_position(
+                self._screen_left + 1, self._screen_top + screen_line + 1)
 
-            colored_line = False
+            background = None
 
-            if self._selection:
-                if self._selection.active_line == read_lines:
-                    if read_lines in self._selection.selected_lines:
-                        cyan_bg = console.SEQUENCE_ESCAPES['cyan background']
-                        line_itens += [cyan_bg]
+            if selection:
+                if selection.active_line == line_index:
+                    if selection.is_selected(line_index):
+                        background = 'cyan background'
                     else:
-                        blue_bg = console.SEQUENCE_ESCAPES['blue background']
-                        line_itens += [blue_bg]
-                    colored_line = True
-                elif read_lines in self._selection.selected_lines:
-                    white_bg = console.SEQUENCE_ESCAPES['white background']
-                    line_itens += [white_bg]
-                    colored_line = True
+                        background = 'blue background'
+                elif selection.is_selected(line_index):
+                    background = 'white background'
 
-            line_itens += [bytes(line, sys.stdout.encoding)]
+            if search and search.is_match(line_index):
+                row = self._highlight_row(
+                        lines[line_index], left, width,
+                        console.SEQUENCE_ESCAPES[background or 'color reset'])
+            else:
+                row = self._row_cache.get((line_index, left, width))
 
-            if len(line) < self.region.width:
-                line_itens += [b' ' * (self.region.width - len(line))]
+                if row is None:
+                    row = self._encode_row(lines[line_index], left, width)
 
-            if colored_line:
-                line_itens += [console.SEQUENCE_ESCAPES['color reset']]
+                    self._row_cache[(line_index, left, width)] = row
 
-            sys.stdout.buffer.write(b''.join(line_itens))
+            if background:
+                console.write(b''.join((
+                    position, console.SEQUENCE_ESCAPES[background], row,
+                    console.SEQUENCE_ESCAPES['color reset'])))
+            else:
+                console.write(position + row)
 
-            printed_lines += 1
+        blank_row = b' ' * width
 
-            if printed_lines == self.region.height:
-                break
+        for screen_line in blank_rows:
+            console.write(console.cursor_position(
+                self._screen_left + 1, self._screen_top + screen_line + 1) +
+                blank_row)
 
         self._dirty = False
+        self._damaged_lines.clear()
 
 
 _size_pattern = re.compile(